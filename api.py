@@ -0,0 +1,121 @@
+"""
+HTTP/JSON API for comparison jobs
+
+    POST /api/jobs                  multipart: file1, file2, threshold -> 202 {"job_id": ...}
+    GET  /api/jobs/{job_id}         status, progress, stage, result when done
+    GET  /api/jobs/{job_id}/events  Server-Sent Events stream of progress until the job finishes
+    GET  /metrics                   stage timers and counters in Prometheus text format
+
+Submit with trace=true to get the job's per-stage timings in its result,
+and with a document_id to re-check only what changed since the previous
+revision of that document (against the same reference). Revision state
+lives in the process that ran the check: behind pre-forked workers a
+revision only reuses it when it lands on the same worker.
+
+With metrics_dir set (pre-forked workers), /metrics serves the sum of
+every worker's published registry instead of this process's alone.
+
+A full queue answers 429 so clients can back off.
+"""
+import json
+import os
+import shutil
+from typing import Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from jobs import FINISHED_STATES, JobQueueFull
+from metrics import metrics, render_directory
+from text_extraction import SUPPORTED_EXTENSIONS
+
+
+def _public(job):
+    """Job record as returned to API clients"""
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'progress': round(job['progress'], 4),
+        'stage': job['stage'],
+        'result': job['result'],
+        'error': job['error'],
+    }
+
+
+def create_api(engine, upload_dir, metrics_dir=None):
+    """FastAPI app exposing the job engine (the Gradio UI can be mounted on it)"""
+    api = FastAPI(title="Multilingual Plagiarism Detector API")
+
+    def save_upload(upload, job_dir, name):
+        extension = os.path.splitext(upload.filename or "")[1].lower()
+        if extension not in SUPPORTED_EXTENSIONS:
+            raise HTTPException(400, f"Unsupported file type: {upload.filename}")
+        path = os.path.join(job_dir, name + extension)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(upload.file, f)
+        return path
+
+    @api.post("/api/jobs", status_code=202)
+    def submit_job(file1: UploadFile = File(...), file2: UploadFile = File(...),
+                   threshold: float = Form(0.8), trace: bool = Form(False),
+                   document_id: Optional[str] = Form(None)):
+        if not 0.0 <= threshold <= 1.0:
+            raise HTTPException(400, "threshold must be between 0 and 1")
+
+        os.makedirs(upload_dir, exist_ok=True)
+        job_dir = os.path.join(upload_dir, os.urandom(8).hex())
+        os.makedirs(job_dir)
+        params = {
+            'file1': save_upload(file1, job_dir, "document1"),
+            'file2': save_upload(file2, job_dir, "document2"),
+            'threshold': threshold,
+            'trace': trace,
+            'document_id': document_id,
+            # Uploaded copies are deleted once the job has run
+            'cleanup_dir': job_dir,
+        }
+        try:
+            job_id = engine.submit(params)
+        except JobQueueFull as e:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return JSONResponse({'error': f"Server busy: {e}"}, status_code=429, headers={'Retry-After': "5"})
+        return {'job_id': job_id, 'status_url': f"/api/jobs/{job_id}"}
+
+    @api.get("/api/jobs/{job_id}")
+    def get_job(job_id: str):
+        job = engine.get(job_id)
+        if job is None:
+            raise HTTPException(404, "Unknown job")
+        return _public(job)
+
+    @api.get("/api/jobs/{job_id}/events")
+    async def stream_job(job_id: str):
+        if engine.get(job_id) is None:
+            raise HTTPException(404, "Unknown job")
+
+        async def events():
+            last_progress = None
+            while True:
+                job = await run_in_threadpool(engine.wait, job_id, last_progress, 15.0)
+                event = _public(job)
+                if job['status'] not in FINISHED_STATES:
+                    event.pop('result')
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                if job['status'] in FINISHED_STATES:
+                    return
+                last_progress = job['progress']
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @api.get("/metrics")
+    def prometheus_metrics():
+        if metrics_dir:
+            # Publish this worker's latest numbers first; the others publish periodically
+            metrics.publish(metrics_dir)
+            text = render_directory(metrics_dir)
+        else:
+            text = metrics.render_prometheus()
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+    return api
@@ -1,380 +1,465 @@
-import gradio as gr
-from plagiarism_checker_multilingual import MultilingualPlagiarismDetector
-import PyPDF2
-import time
-
-# Initialize with multilingual pre-trained Hugging Face model
-detector = MultilingualPlagiarismDetector()
-
-def extract_text_from_pdf(pdf_file):
-    """Extract text from PDF"""
-    try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-def get_severity_color(percentage):
-    """Return color based on plagiarism severity"""
-    if percentage >= 75:
-        return "#d32f2f", "Critical", "🚨"
-    elif percentage >= 50:
-        return "#f57c00", "High", "⚠️"
-    elif percentage >= 25:
-        return "#fbc02d", "Moderate", "⚡"
-    else:
-        return "#388e3c", "Low", "✅"
-
-def create_progress_bar(percentage):
-    """Create a visual progress bar"""
-    color, severity, icon = get_severity_color(percentage)
-    
-    return f"""
-    <div style="margin: 20px 0;">
-        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
-            <span style="font-size: 18px; font-weight: 600; color: #1a237e;">Plagiarism Score</span>
-            <span style="font-size: 24px; font-weight: 700; color: {color};">{icon} {percentage:.1f}%</span>
-        </div>
-        <div style="background: #e0e0e0; border-radius: 10px; height: 30px; overflow: hidden; box-shadow: inset 0 2px 4px rgba(0,0,0,0.1);">
-            <div style="background: linear-gradient(90deg, {color}, {color}aa); width: {percentage}%; height: 100%; 
-                        border-radius: 10px; transition: width 0.5s ease; display: flex; align-items: center; justify-content: flex-end; padding-right: 10px;">
-                <span style="color: white; font-weight: 600; font-size: 12px;">{severity}</span>
-            </div>
-        </div>
-    </div>
-    """
-
-def check_plagiarism_interface(file1, file2, threshold, progress=gr.Progress()):
-    """Main function for Gradio with progress tracking"""
-    
-    if not file1 or not file2:
-        return "", "<div style='text-align: center; padding: 40px; color: #757575;'>⚠️ Please upload both documents</div>"
-    
-    progress(0.2, desc="📄 Extracting text from documents...")
-    time.sleep(0.3)
-    
-    # Extract text
-    if file1.name.endswith('.pdf'):
-        text1 = extract_text_from_pdf(file1)
-    else:
-        text1 = file1.read().decode('utf-8')
-    
-    if file2.name.endswith('.pdf'):
-        text2 = extract_text_from_pdf(file2)
-    else:
-        text2 = file2.read().decode('utf-8')
-    
-    progress(0.5, desc="🤖 Analyzing with AI model...")
-    time.sleep(0.5)
-    
-    # Check plagiarism using multilingual pre-trained Hugging Face model
-    pct, matches = detector.check_plagiarism(text1, text2, threshold)
-    
-    progress(0.8, desc="📊 Generating report...")
-    time.sleep(0.3)
-    
-    total_sentences = len(detector.split_into_sentences(text1))
-    color, severity, icon = get_severity_color(pct)
-    
-    # Create beautiful report
-    report = f"""
-    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 15px; color: white; margin-bottom: 20px; box-shadow: 0 10px 30px rgba(0,0,0,0.3);">
-        <h1 style="margin: 0; font-size: 32px; font-weight: 700;">🔍 Plagiarism Analysis Report</h1>
-        <p style="margin: 10px 0 0 0; opacity: 0.9; font-size: 16px;">Powered by Hugging Face Multilingual AI 🤗🌍</p>
-    </div>
-    
-    {create_progress_bar(pct)}
-    
-    <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin: 30px 0;">
-        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 25px; border-radius: 12px; text-align: center; color: white; box-shadow: 0 4px 15px rgba(102,126,234,0.4);">
-            <div style="font-size: 36px; font-weight: 700; margin-bottom: 5px;">{total_sentences}</div>
-            <div style="font-size: 14px; opacity: 0.9;">Total Sentences</div>
-        </div>
-        
-        <div style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); padding: 25px; border-radius: 12px; text-align: center; color: white; box-shadow: 0 4px 15px rgba(245,87,108,0.4);">
-            <div style="font-size: 36px; font-weight: 700; margin-bottom: 5px;">{len(matches)}</div>
-            <div style="font-size: 14px; opacity: 0.9;">Matches Found</div>
-        </div>
-        
-        <div style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%); padding: 25px; border-radius: 12px; text-align: center; color: white; box-shadow: 0 4px 15px rgba(79,172,254,0.4);">
-            <div style="font-size: 36px; font-weight: 700; margin-bottom: 5px;">{int(threshold*100)}%</div>
-            <div style="font-size: 14px; opacity: 0.9;">Threshold Used</div>
-        </div>
-        
-        <div style="background: linear-gradient(135deg, {color}dd 0%, {color} 100%); padding: 25px; border-radius: 12px; text-align: center; color: white; box-shadow: 0 4px 15px rgba(0,0,0,0.3);">
-            <div style="font-size: 36px; font-weight: 700; margin-bottom: 5px;">{severity}</div>
-            <div style="font-size: 14px; opacity: 0.9;">Severity Level</div>
-        </div>
-    </div>
-    
-    <div style="background: #f5f5f5; padding: 20px; border-radius: 10px; border-left: 5px solid #667eea; margin: 20px 0;">
-        <h3 style="margin: 0 0 10px 0; color: #1a237e; font-size: 16px;">🤗 Model Information</h3>
-        <p style="margin: 5px 0; color: #424242; font-size: 14px;"><strong>Model:</strong> paraphrase-multilingual-MiniLM-L12-v2</p>
-        <p style="margin: 5px 0; color: #424242; font-size: 14px;"><strong>Languages:</strong> Tamil, Hindi, English, Telugu, Bengali + 45 more</p>
-        <p style="margin: 5px 0; color: #424242; font-size: 14px;"><strong>Type:</strong> Sentence Transformer (Pre-trained BERT)</p>
-    </div>
-    """
-    
-    # Detailed matches with beautiful cards
-    matches_html = """
-    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 20px; border-radius: 15px; color: white; margin-bottom: 20px;">
-        <h2 style="margin: 0; font-size: 24px; font-weight: 600;">🔍 Detailed Match Analysis</h2>
-    </div>
-    """
-    
-    if matches:
-        for idx, match in enumerate(matches, 1):
-            similarity_pct = match['similarity'] * 100
-            bar_color, _, _ = get_severity_color(similarity_pct)
-            
-            matches_html += f"""
-            <div style="background: white; border-radius: 12px; padding: 25px; margin: 15px 0; 
-                        box-shadow: 0 4px 20px rgba(0,0,0,0.1); border-left: 6px solid {bar_color};
-                        transition: transform 0.2s, box-shadow 0.2s;">
-                
-                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px;">
-                    <h3 style="margin: 0; color: #1a237e; font-size: 18px; font-weight: 600;">
-                        Match #{idx}
-                    </h3>
-                    <div style="background: {bar_color}; color: white; padding: 8px 16px; border-radius: 20px; font-weight: 600; font-size: 14px;">
-                        {similarity_pct:.1f}% Similar
-                    </div>
-                </div>
-                
-                <div style="background: #fff3e0; border-left: 4px solid #ff9800; padding: 15px; border-radius: 8px; margin: 10px 0;">
-                    <div style="color: #e65100; font-weight: 600; font-size: 12px; text-transform: uppercase; margin-bottom: 8px;">
-                        📄 Document 1 (Original)
-                    </div>
-                    <div style="color: #424242; line-height: 1.6; font-size: 15px;">
-                        {match['original']}
-                    </div>
-                </div>
-                
-                <div style="background: #e3f2fd; border-left: 4px solid #2196f3; padding: 15px; border-radius: 8px; margin: 10px 0;">
-                    <div style="color: #0d47a1; font-weight: 600; font-size: 12px; text-transform: uppercase; margin-bottom: 8px;">
-                        📄 Document 2 (Matched)
-                    </div>
-                    <div style="color: #424242; line-height: 1.6; font-size: 15px;">
-                        {match['matched']}
-                    </div>
-                </div>
-                
-                <div style="margin-top: 10px; padding-top: 10px; border-top: 1px solid #e0e0e0;">
-                    <span style="color: #757575; font-size: 12px;">Sentence Position: #{match['sentence_num']}</span>
-                </div>
-            </div>
-            """
-    else:
-        matches_html += """
-        <div style="background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%); 
-                    padding: 40px; border-radius: 15px; text-align: center; color: white;
-                    box-shadow: 0 10px 30px rgba(56,239,125,0.3);">
-            <div style="font-size: 64px; margin-bottom: 20px;">✅</div>
-            <h3 style="margin: 0; font-size: 28px; font-weight: 700;">No Plagiarism Detected!</h3>
-            <p style="margin: 15px 0 0 0; font-size: 16px; opacity: 0.9;">
-                The documents appear to be original and unique.
-            </p>
-        </div>
-        """
-    
-    progress(1.0, desc="✅ Complete!")
-    return report, matches_html
-
-# Custom CSS for even better styling
-custom_css = """
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-
-* {
-    font-family: 'Inter', sans-serif !important;
-}
-
-.gradio-container {
-    max-width: 1400px !important;
-}
-
-.gr-button-primary {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-    border: none !important;
-    font-weight: 600 !important;
-    font-size: 16px !important;
-    padding: 12px 32px !important;
-    border-radius: 8px !important;
-    transition: all 0.3s ease !important;
-    box-shadow: 0 4px 15px rgba(102,126,234,0.4) !important;
-}
-
-.gr-button-primary:hover {
-    transform: translateY(-2px) !important;
-    box-shadow: 0 6px 20px rgba(102,126,234,0.6) !important;
-}
-
-.gr-file {
-    border: 2px dashed #667eea !important;
-    border-radius: 10px !important;
-    transition: all 0.3s ease !important;
-}
-
-.gr-file:hover {
-    border-color: #764ba2 !important;
-    background: #f8f9ff !important;
-}
-
-footer {
-    display: none !important;
-}
-"""
-
-# Create stunning Gradio interface
-with gr.Blocks(theme=gr.themes.Soft(), css=custom_css, title="🤗🌍 Multilingual Plagiarism Detector") as demo:
-    
-    gr.HTML("""
-    <div style="text-align: center; padding: 40px 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 20px; margin-bottom: 30px; box-shadow: 0 10px 40px rgba(0,0,0,0.2);">
-        <h1 style="color: white; font-size: 48px; margin: 0; font-weight: 700; letter-spacing: -1px;">
-            🤗🌍 Multilingual Plagiarism Detector
-        </h1>
-        <p style="color: rgba(255,255,255,0.95); font-size: 20px; margin: 15px 0 0 0; font-weight: 400;">
-            AI-Powered Plagiarism Detection Across 50+ Languages
-        </p>
-        <div style="margin-top: 20px; display: flex; justify-content: center; gap: 15px; flex-wrap: wrap;">
-            <span style="background: rgba(255,255,255,0.2); padding: 8px 16px; border-radius: 20px; color: white; font-size: 14px; backdrop-filter: blur(10px);">
-                ✨ Tamil
-            </span>
-            <span style="background: rgba(255,255,255,0.2); padding: 8px 16px; border-radius: 20px; color: white; font-size: 14px; backdrop-filter: blur(10px);">
-                🌟 Hindi
-            </span>
-            <span style="background: rgba(255,255,255,0.2); padding: 8px 16px; border-radius: 20px; color: white; font-size: 14px; backdrop-filter: blur(10px);">
-                💫 English
-            </span>
-            <span style="background: rgba(255,255,255,0.2); padding: 8px 16px; border-radius: 20px; color: white; font-size: 14px; backdrop-filter: blur(10px);">
-                ⚡ +47 More
-            </span>
-        </div>
-    </div>
-    """)
-    
-    with gr.Row():
-        with gr.Column(scale=1):
-            gr.Markdown("""
-            ### 📄 Document 1
-            <p style="color: #757575; font-size: 14px;">Upload the original document</p>
-            """)
-            file1 = gr.File(
-                label="", 
-                file_types=['.pdf', '.txt'],
-                file_count="single"
-            )
-        
-        with gr.Column(scale=1):
-            gr.Markdown("""
-            ### 📄 Document 2
-            <p style="color: #757575; font-size: 14px;">Upload the document to check</p>
-            """)
-            file2 = gr.File(
-                label="", 
-                file_types=['.pdf', '.txt'],
-                file_count="single"
-            )
-    
-    with gr.Row():
-        threshold = gr.Slider(
-            0.5, 1.0, 
-            value=0.8, 
-            step=0.05,
-            label="🎯 Similarity Threshold",
-            info="Adjust sensitivity: Lower = catch more matches | Higher = stricter detection"
-        )
-    
-    check_btn = gr.Button(
-        "🔍 Analyze Documents with AI", 
-        variant="primary", 
-        size="lg",
-        scale=1
-    )
-    
-    gr.HTML("""
-    <div style="text-align: center; margin: 20px 0; padding: 15px; background: #f5f5f5; border-radius: 10px;">
-        <p style="margin: 0; color: #757575; font-size: 14px;">
-            ⚡ Powered by Hugging Face Transformers • 🚀 Lightning Fast Analysis • 🔒 Secure & Private
-        </p>
-    </div>
-    """)
-    
-    with gr.Row():
-        with gr.Column(scale=1):
-            report_output = gr.HTML()
-        
-        with gr.Column(scale=1):
-            matches_output = gr.HTML()
-    
-    check_btn.click(
-        fn=check_plagiarism_interface,
-        inputs=[file1, file2, threshold],
-        outputs=[report_output, matches_output]
-    )
-    
-    gr.HTML("""
-    <div style="margin-top: 40px; padding: 30px; background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); border-radius: 15px;">
-        <h3 style="color: #1a237e; margin: 0 0 20px 0; font-size: 24px;">📚 How It Works</h3>
-        
-        <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 20px;">
-            <div style="background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
-                <div style="font-size: 32px; margin-bottom: 10px;">📤</div>
-                <h4 style="color: #667eea; margin: 0 0 10px 0;">1. Upload Documents</h4>
-                <p style="color: #757575; margin: 0; font-size: 14px;">Upload PDFs or text files in any supported language</p>
-            </div>
-            
-            <div style="background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
-                <div style="font-size: 32px; margin-bottom: 10px;">🤖</div>
-                <h4 style="color: #667eea; margin: 0 0 10px 0;">2. AI Analysis</h4>
-                <p style="color: #757575; margin: 0; font-size: 14px;">Pre-trained multilingual BERT analyzes sentence similarity</p>
-            </div>
-            
-            <div style="background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
-                <div style="font-size: 32px; margin-bottom: 10px;">📊</div>
-                <h4 style="color: #667eea; margin: 0 0 10px 0;">3. Get Results</h4>
-                <p style="color: #757575; margin: 0; font-size: 14px;">View detailed plagiarism report with matched sentences</p>
-            </div>
-            
-            <div style="background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
-                <div style="font-size: 32px; margin-bottom: 10px;">🌍</div>
-                <h4 style="color: #667eea; margin: 0 0 10px 0;">4. Cross-Language</h4>
-                <p style="color: #757575; margin: 0; font-size: 14px;">Detects plagiarism even across different languages!</p>
-            </div>
-        </div>
-    </div>
-    
-    <div style="margin-top: 30px; padding: 25px; background: white; border-radius: 15px; border: 2px solid #667eea;">
-        <h3 style="color: #1a237e; margin: 0 0 15px 0; font-size: 20px;">🌐 Supported Languages (50+)</h3>
-        <div style="display: flex; flex-wrap: wrap; gap: 10px;">
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Tamil (தமிழ்)</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Hindi (हिन्दी)</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">English</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Telugu</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Bengali</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Marathi</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Gujarati</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Kannada</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Malayalam</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Spanish</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">French</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">German</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Chinese</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Japanese</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Korean</span>
-            <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">+ 35 More!</span>
-        </div>
-    </div>
-    
-    <div style="margin-top: 30px; text-align: center; padding: 20px; background: #f5f5f5; border-radius: 10px;">
-        <p style="margin: 0; color: #424242; font-size: 14px;">
-            Built with ❤️ by Moogambika Govindaraj
-        </p>
-        
-    </div>
-    """)
-
-if __name__ == "__main__":
-    demo.launch(share=False)
\ No newline at end of file
+import html
+import logging
+import os
+import shutil
+from batching_scheduler import MicroBatchScheduler
+from jobs import DEFAULT_JOBS_DIR, FAILED, FINISHED_STATES, JobEngine, JobQueueFull, JobStore
+from metrics import metrics, start_trace
+from plagiarism_checker_multilingual import MultilingualPlagiarismDetector
+from report import (MATCHES_PER_PAGE, REPORT_CSS, page_count, render_matches,
+                    render_progress_report, render_report)
+from text_extraction import extract_pages
+
+# Concurrent requests handled by Gradio; their encoding work is merged into shared batches
+CONCURRENCY_LIMIT = int(os.environ.get("PLAGIARISM_CONCURRENCY", "20"))
+MAX_BATCH_SIZE = int(os.environ.get("PLAGIARISM_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.environ.get("PLAGIARISM_MAX_WAIT_MS", "10"))
+
+# Background comparison jobs shared by the UI and the HTTP API
+JOB_WORKERS = int(os.environ.get("PLAGIARISM_JOB_WORKERS", str(CONCURRENCY_LIMIT)))
+MAX_PENDING_JOBS = int(os.environ.get("PLAGIARISM_MAX_PENDING_JOBS", "100"))
+JOBS_DIR = os.environ.get("PLAGIARISM_JOBS_DIR", DEFAULT_JOBS_DIR)
+
+# Stage timers and counters, served in Prometheus format at /metrics
+logging.basicConfig(level=os.environ.get("PLAGIARISM_LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+if os.environ.get("PLAGIARISM_METRICS", "1") != "0":
+    metrics.enable()
+
+STAGE_LABELS = {
+    None: "⏳ Waiting in queue...",
+    'extraction': "📄 Extracting text from documents...",
+    'segmentation': "✂️ Splitting into sentences...",
+    'lexical': "🔎 Looking for verbatim copies...",
+    'encoding': "🤖 Analyzing with AI model...",
+    'matching': "🧮 Matching sentences..."
+}
+
+# Pinned local snapshot (see model_snapshot.py); when set, the Hub is never contacted
+MODEL_DIR = os.environ.get("PLAGIARISM_MODEL_DIR")
+# Model cascade: a cheaper draft model (or the first N layers) settles clear-cut same-language pairs
+DRAFT_MODEL = os.environ.get("PLAGIARISM_DRAFT_MODEL")
+DRAFT_LAYERS = int(os.environ["PLAGIARISM_DRAFT_LAYERS"]) if os.environ.get("PLAGIARISM_DRAFT_LAYERS") else None
+# Draft score standing for the full model's threshold (see MultilingualPlagiarismDetector.calibrate_draft)
+DRAFT_THRESHOLD = float(os.environ["PLAGIARISM_DRAFT_THRESHOLD"]) if os.environ.get("PLAGIARISM_DRAFT_THRESHOLD") else None
+# SQLite file caching sentence embeddings across checks and restarts (unset = no cache)
+EMBEDDING_CACHE = os.environ.get("PLAGIARISM_EMBEDDING_CACHE")
+# Directory caching extracted page text of uploads on disk (unset = memory only: uploads are deleted
+# after each job, and their text should not outlive them unless asked for)
+PAGE_CACHE_DIR = os.environ.get("PLAGIARISM_PAGE_CACHE_DIR")
+# Pre-forked server processes sharing one copy of the model (1 = single process with the UI)
+SERVER_WORKERS = int(os.environ.get("PLAGIARISM_WORKERS", "1"))
+
+# Set by start_services (the model is not loaded at import time)
+detector = None
+job_engine = None
+
+def open_embedding_cache():
+    """EmbeddingCache on EMBEDDING_CACHE, or None when it is not set (open one per process, after any fork)"""
+    if not EMBEDDING_CACHE:
+        return None
+    from embedding_cache import EmbeddingCache
+    path = os.path.expanduser(EMBEDDING_CACHE)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return EmbeddingCache(path)
+
+def load_detector(cache=None):
+    """Load the multilingual pre-trained model (offline from MODEL_DIR if set) and warm it up"""
+    if MODEL_DIR:
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        loaded = MultilingualPlagiarismDetector(MODEL_DIR, cache=cache, local_files_only=True,
+                                                draft_model=DRAFT_MODEL, draft_layers=DRAFT_LAYERS,
+                                                draft_threshold=DRAFT_THRESHOLD)
+    else:
+        loaded = MultilingualPlagiarismDetector(cache=cache, draft_model=DRAFT_MODEL, draft_layers=DRAFT_LAYERS,
+                                                draft_threshold=DRAFT_THRESHOLD)
+    loaded.warm_up()
+    return loaded
+
+def start_services(loaded_detector, recover_jobs=True):
+    """Attach the batch scheduler and start the job engine (threads: call after any fork)"""
+    global detector, job_engine
+    detector = loaded_detector
+    
+    # One scheduler thread owns the model; every request's sentences are batched together
+    detector.batch_scheduler = MicroBatchScheduler(
+        lambda sentences: detector.encode_batch(sentences, batch_size=MAX_BATCH_SIZE),
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_WAIT_MS
+    )
+    # The cascade's draft model gets a scheduler thread of its own, so job threads batch its work too
+    if detector.draft is not None:
+        detector.draft.batch_scheduler = MicroBatchScheduler(
+            lambda sentences: detector.draft.encode_batch(sentences, batch_size=MAX_BATCH_SIZE),
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait_ms=MAX_WAIT_MS
+        )
+    job_engine = JobEngine(
+        run_comparison,
+        JobStore(os.path.join(JOBS_DIR, "jobs.sqlite3"), recover=recover_jobs),
+        workers=JOB_WORKERS,
+        max_pending=MAX_PENDING_JOBS
+    )
+
+def extract_document_pages(uploaded_file):
+    """Extract per-page text from an uploaded PDF/TXT (parallel, cached by content hash)"""
+    path = getattr(uploaded_file, 'name', uploaded_file)
+    try:
+        return extract_pages(path, cache_dir=PAGE_CACHE_DIR and os.path.expanduser(PAGE_CACHE_DIR))
+    except Exception as e:
+        return [f"Error: {str(e)}"]
+
+def run_comparison(params, progress):
+    """Job body: extract both documents and compare them, reporting real progress and matches"""
+    try:
+        with start_trace() as trace:
+            progress(0.0, 'extraction')
+            pages1 = extract_document_pages(params['file1'])
+            progress(0.075, 'extraction')
+            pages2 = extract_document_pages(params['file2'])
+            progress(0.15, 'extraction')
+            
+            # Check plagiarism using multilingual pre-trained Hugging Face model;
+            # revisions of a known document only re-check what changed
+            current = [0.15, 'extraction']
+            def stage_progress(fraction, stage):
+                current[:] = [0.15 + 0.85 * fraction, stage]
+                progress(*current)
+            if params.get('document_id'):
+                pct, matches = detector.recheck(params['document_id'], pages1, pages2,
+                                                params['threshold'], progress=stage_progress)
+            else:
+                # Matches are streamed to the UI as soon as each batch is found
+                pct, matches = detector.check_plagiarism(
+                    pages1, pages2, params['threshold'], progress=stage_progress,
+                    on_matches=lambda found: progress(*current, partial=found)
+                )
+        result = {
+            'plagiarism_percentage': pct,
+            'matches': matches,
+            'total_sentences': len(detector.split_into_sentences(pages1)),
+            'threshold': params['threshold']
+        }
+        if params.get('trace'):
+            result['trace'] = trace.to_dict()
+        return result
+    finally:
+        if params.get('cleanup_dir'):
+            shutil.rmtree(params['cleanup_dir'], ignore_errors=True)
+
+def check_plagiarism_interface(file1, file2, threshold, progress):
+    """Main function for Gradio: streams matches while the analysis runs, then the full report"""
+    import gradio as gr
+    
+    if not file1 or not file2:
+        yield "", "<div style='text-align: center; padding: 40px; color: #757575;'>⚠️ Please upload both documents</div>", [], 1
+        return
+    
+    # Run the comparison as a background job, like API clients do
+    try:
+        job_id = job_engine.submit({
+            'file1': getattr(file1, 'name', file1),
+            'file2': getattr(file2, 'name', file2),
+            'threshold': threshold
+        })
+    except JobQueueFull:
+        yield "", "<div style='text-align: center; padding: 40px; color: #757575;'>⏳ The server is busy, please try again in a moment</div>", [], 1
+        return
+    
+    # Follow the job's real progress, showing the first page of matches as they are found
+    found = []
+    job = job_engine.get(job_id)
+    while job['status'] not in FINISHED_STATES:
+        progress(job['progress'], desc=STAGE_LABELS.get(job['stage'], "⏳ Working..."))
+        new_matches = job_engine.partial(job_id, len(found))
+        if new_matches:
+            first_page_changed = len(found) < MATCHES_PER_PAGE
+            found.extend(new_matches)
+            if first_page_changed:
+                yield render_progress_report(len(found)), render_matches(found, complete=False), [], 1
+            else:
+                yield render_progress_report(len(found)), gr.update(), [], 1
+        job = job_engine.wait(job_id, job['progress'])
+    
+    if job['status'] == FAILED:
+        yield "", f"<div style='text-align: center; padding: 40px; color: #d32f2f;'>❌ Analysis failed: {html.escape(job['error'] or '')}</div>", [], 1
+        return
+    
+    progress(1.0, desc="📊 Generating report...")
+    result = job['result']
+    pct = result['plagiarism_percentage']
+    matches = result['matches']
+    total_sentences = result['total_sentences']
+    with metrics.timer('rendering'):
+        report = render_report(pct, matches, total_sentences, threshold)
+        matches_html = render_matches(matches, page=1)
+    yield report, matches_html, matches, 1
+
+def change_page(matches, page, step):
+    """Render another page of the finished match list"""
+    page = max(1, min(page + step, page_count(len(matches))))
+    return render_matches(matches, page=page), page
+
+# Custom CSS for even better styling
+custom_css = """
+@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+
+* {
+    font-family: 'Inter', sans-serif !important;
+}
+
+.gradio-container {
+    max-width: 1400px !important;
+}
+
+.gr-button-primary {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
+    border: none !important;
+    font-weight: 600 !important;
+    font-size: 16px !important;
+    padding: 12px 32px !important;
+    border-radius: 8px !important;
+    transition: all 0.3s ease !important;
+    box-shadow: 0 4px 15px rgba(102,126,234,0.4) !important;
+}
+
+.gr-button-primary:hover {
+    transform: translateY(-2px) !important;
+    box-shadow: 0 6px 20px rgba(102,126,234,0.6) !important;
+}
+
+.gr-file {
+    border: 2px dashed #667eea !important;
+    border-radius: 10px !important;
+    transition: all 0.3s ease !important;
+}
+
+.gr-file:hover {
+    border-color: #764ba2 !important;
+    background: #f8f9ff !important;
+}
+
+footer {
+    display: none !important;
+}
+"""
+
+def build_ui():
+    """Build the Gradio Blocks UI (Gradio is only imported here, so API-only workers never load it)"""
+    import gradio as gr
+    
+    def analyze(file1, file2, threshold, progress=gr.Progress()):
+        yield from check_plagiarism_interface(file1, file2, threshold, progress)
+    
+    # Create stunning Gradio interface
+    with gr.Blocks(theme=gr.themes.Soft(), css=custom_css + REPORT_CSS, title="🤗🌍 Multilingual Plagiarism Detector") as demo:
+    
+        gr.HTML("""
+        <div style="text-align: center; padding: 40px 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 20px; margin-bottom: 30px; box-shadow: 0 10px 40px rgba(0,0,0,0.2);">
+            <h1 style="color: white; font-size: 48px; margin: 0; font-weight: 700; letter-spacing: -1px;">
+                🤗🌍 Multilingual Plagiarism Detector
+            </h1>
+            <p style="color: rgba(255,255,255,0.95); font-size: 20px; margin: 15px 0 0 0; font-weight: 400;">
+                AI-Powered Plagiarism Detection Across 50+ Languages
+            </p>
+            <div style="margin-top: 20px; display: flex; justify-content: center; gap: 15px; flex-wrap: wrap;">
+                <span style="background: rgba(255,255,255,0.2); padding: 8px 16px; border-radius: 20px; color: white; font-size: 14px; backdrop-filter: blur(10px);">
+                    ✨ Tamil
+                </span>
+                <span style="background: rgba(255,255,255,0.2); padding: 8px 16px; border-radius: 20px; color: white; font-size: 14px; backdrop-filter: blur(10px);">
+                    🌟 Hindi
+                </span>
+                <span style="background: rgba(255,255,255,0.2); padding: 8px 16px; border-radius: 20px; color: white; font-size: 14px; backdrop-filter: blur(10px);">
+                    💫 English
+                </span>
+                <span style="background: rgba(255,255,255,0.2); padding: 8px 16px; border-radius: 20px; color: white; font-size: 14px; backdrop-filter: blur(10px);">
+                    ⚡ +47 More
+                </span>
+            </div>
+        </div>
+        """)
+    
+        with gr.Row():
+            with gr.Column(scale=1):
+                gr.Markdown("""
+                ### 📄 Document 1
+                <p style="color: #757575; font-size: 14px;">Upload the original document</p>
+                """)
+                file1 = gr.File(
+                    label="", 
+                    file_types=['.pdf', '.txt'],
+                    file_count="single"
+                )
+        
+            with gr.Column(scale=1):
+                gr.Markdown("""
+                ### 📄 Document 2
+                <p style="color: #757575; font-size: 14px;">Upload the document to check</p>
+                """)
+                file2 = gr.File(
+                    label="", 
+                    file_types=['.pdf', '.txt'],
+                    file_count="single"
+                )
+    
+        with gr.Row():
+            threshold = gr.Slider(
+                0.5, 1.0, 
+                value=0.8, 
+                step=0.05,
+                label="🎯 Similarity Threshold",
+                info="Adjust sensitivity: Lower = catch more matches | Higher = stricter detection"
+            )
+    
+        check_btn = gr.Button(
+            "🔍 Analyze Documents with AI", 
+            variant="primary", 
+            size="lg",
+            scale=1
+        )
+    
+        gr.HTML("""
+        <div style="text-align: center; margin: 20px 0; padding: 15px; background: #f5f5f5; border-radius: 10px;">
+            <p style="margin: 0; color: #757575; font-size: 14px;">
+                ⚡ Powered by Hugging Face Transformers • 🚀 Lightning Fast Analysis • 🔒 Secure & Private
+            </p>
+        </div>
+        """)
+    
+        with gr.Row():
+            with gr.Column(scale=1):
+                report_output = gr.HTML()
+        
+            with gr.Column(scale=1):
+                matches_output = gr.HTML()
+                with gr.Row():
+                    prev_btn = gr.Button("◀ Previous matches", size="sm")
+                    next_btn = gr.Button("Next matches ▶", size="sm")
+    
+        # Full match list of the last analysis and the page shown
+        matches_state = gr.State([])
+        page_state = gr.State(1)
+    
+        check_btn.click(
+            fn=analyze,
+            inputs=[file1, file2, threshold],
+            outputs=[report_output, matches_output, matches_state, page_state],
+            concurrency_limit=CONCURRENCY_LIMIT
+        )
+        prev_btn.click(
+            fn=lambda matches, page: change_page(matches, page, -1),
+            inputs=[matches_state, page_state],
+            outputs=[matches_output, page_state]
+        )
+        next_btn.click(
+            fn=lambda matches, page: change_page(matches, page, 1),
+            inputs=[matches_state, page_state],
+            outputs=[matches_output, page_state]
+        )
+    
+        gr.HTML("""
+        <div style="margin-top: 40px; padding: 30px; background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); border-radius: 15px;">
+            <h3 style="color: #1a237e; margin: 0 0 20px 0; font-size: 24px;">📚 How It Works</h3>
+        
+            <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 20px;">
+                <div style="background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                    <div style="font-size: 32px; margin-bottom: 10px;">📤</div>
+                    <h4 style="color: #667eea; margin: 0 0 10px 0;">1. Upload Documents</h4>
+                    <p style="color: #757575; margin: 0; font-size: 14px;">Upload PDFs or text files in any supported language</p>
+                </div>
+            
+                <div style="background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                    <div style="font-size: 32px; margin-bottom: 10px;">🤖</div>
+                    <h4 style="color: #667eea; margin: 0 0 10px 0;">2. AI Analysis</h4>
+                    <p style="color: #757575; margin: 0; font-size: 14px;">Pre-trained multilingual BERT analyzes sentence similarity</p>
+                </div>
+            
+                <div style="background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                    <div style="font-size: 32px; margin-bottom: 10px;">📊</div>
+                    <h4 style="color: #667eea; margin: 0 0 10px 0;">3. Get Results</h4>
+                    <p style="color: #757575; margin: 0; font-size: 14px;">View detailed plagiarism report with matched sentences</p>
+                </div>
+            
+                <div style="background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                    <div style="font-size: 32px; margin-bottom: 10px;">🌍</div>
+                    <h4 style="color: #667eea; margin: 0 0 10px 0;">4. Cross-Language</h4>
+                    <p style="color: #757575; margin: 0; font-size: 14px;">Detects plagiarism even across different languages!</p>
+                </div>
+            </div>
+        </div>
+    
+        <div style="margin-top: 30px; padding: 25px; background: white; border-radius: 15px; border: 2px solid #667eea;">
+            <h3 style="color: #1a237e; margin: 0 0 15px 0; font-size: 20px;">🌐 Supported Languages (50+)</h3>
+            <div style="display: flex; flex-wrap: wrap; gap: 10px;">
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Tamil (தமிழ்)</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Hindi (हिन्दी)</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">English</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Telugu</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Bengali</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Marathi</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Gujarati</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Kannada</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Malayalam</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Spanish</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">French</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">German</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Chinese</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Japanese</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">Korean</span>
+                <span style="background: #e8eaf6; color: #3f51b5; padding: 6px 12px; border-radius: 15px; font-size: 13px;">+ 35 More!</span>
+            </div>
+        </div>
+    
+        <div style="margin-top: 30px; text-align: center; padding: 20px; background: #f5f5f5; border-radius: 10px;">
+            <p style="margin: 0; color: #424242; font-size: 14px;">
+                Built with ❤️ by Moogambika Govindaraj
+            </p>
+        
+        </div>
+        """)
+    
+    return demo
+
+if __name__ == "__main__":
+    import uvicorn
+    from api import create_api
+    
+    host = os.environ.get("GRADIO_SERVER_NAME", "127.0.0.1")
+    port = int(os.environ.get("GRADIO_SERVER_PORT", "7860"))
+    
+    if SERVER_WORKERS > 1:
+        import torch
+        from prefork import serve_prefork
+        
+        # Warm up single-threaded: OpenMP thread pools must not exist before fork
+        torch.set_num_threads(1)
+        loaded = load_detector()
+        JobStore(os.path.join(JOBS_DIR, "jobs.sqlite3"))  # fail jobs interrupted by the last shutdown, once
+        # Every worker publishes its metrics registry here; /metrics serves their sum
+        metrics_dir = os.path.join(JOBS_DIR, "metrics")
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        threads = int(os.environ.get("PLAGIARISM_THREADS_PER_WORKER", max(1, (os.cpu_count() or 1) // SERVER_WORKERS)))
+        
+        def create_worker_app():
+            # API only: Gradio's queue keeps per-process session state
+            torch.set_num_threads(threads)
+            # SQLite connections must not cross the fork: every worker opens its own
+            loaded.cache = open_embedding_cache()
+            if loaded.draft is not None:
+                loaded.draft.cache = loaded.cache
+            start_services(loaded, recover_jobs=False)
+            if metrics.enabled:
+                metrics.start_publishing(metrics_dir)
+            return create_api(job_engine, os.path.join(JOBS_DIR, "uploads"),
+                              metrics_dir=metrics_dir if metrics.enabled else None)
+        
+        serve_prefork(create_worker_app, host, port, SERVER_WORKERS)
+    else:
+        import gradio as gr
+        
+        start_services(load_detector(open_embedding_cache()))
+        
+        # Serve the JSON job API and the Gradio UI from one server
+        demo = build_ui()
+        demo.queue(default_concurrency_limit=CONCURRENCY_LIMIT, max_size=CONCURRENCY_LIMIT * 5)
+        server = gr.mount_gradio_app(create_api(job_engine, os.path.join(JOBS_DIR, "uploads")), demo, path="/")
+        uvicorn.run(server, host=host, port=port)
\ No newline at end of file
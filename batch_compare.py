@@ -0,0 +1,298 @@
+"""
+Batch plagiarism comparison over directories or manifests
+
+Compares every submission against every reference and writes one JSON line
+per document pair to the output file as soon as that pair is finished:
+
+    python batch_compare.py --submissions new/ --references archive.txt \
+        --output results.jsonl --extract-workers 8 --model-workers 2
+
+Text extraction runs in a process pool; comparisons run in a small pool of
+processes that each own one model. Re-running with the same output file
+skips every pair already written, so a crashed run resumes where it stopped;
+pairs that ended in an error are retried (their new line supersedes the old).
+A model worker that dies is replaced and its in-flight pairs are resubmitted.
+
+With --lexical-prune, pairs that share no near-verbatim sentence (MinHash/LSH
+buckets) are written as pruned without running the model. This is fast but
+drops translated (cross-language) copies, so it is off by default.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from text_extraction import SUPPORTED_EXTENSIONS, try_extract_pages
+
+logger = logging.getLogger(__name__)
+
+# Times a pair is submitted before a crashing model worker is recorded as its error
+MAX_PAIR_ATTEMPTS = 3
+
+# Per-process state of model workers (set by _init_model_worker)
+_detector = None
+_reference_texts = None
+_lexical_index = None
+_candidates = (None, None)
+
+
+def list_documents(source):
+    """
+    Resolve a directory (recursively) or a manifest file into document paths
+
+    A manifest is a text file with one document path per line; relative
+    paths are resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    return [os.path.normpath(os.path.join(base, line)) for line in lines
+            if line and not line.startswith('#')]
+
+
+def load_completed_pairs(output_path):
+    """
+    Read pairs already present in a results file
+
+    Error records do not count as done, so failed pairs are retried. A line
+    cut short by a crash is removed so new results append cleanly.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, 'rb+') as f:
+        data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+            f.truncate(complete)
+
+    for line in data[:complete].decode('utf-8').splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if 'error' not in record:
+            done.add((record['submission'], record['reference']))
+    return done
+
+
+def _windowed_map(executor, fn, items, window):
+    """executor.map with at most `window` results held at any time, in order"""
+    futures = deque()
+    for item in items:
+        futures.append(executor.submit(fn, item))
+        if len(futures) >= window:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+
+def _init_model_worker(detector_kwargs, reference_texts, lexical_prune=False):
+    global _detector, _reference_texts, _lexical_index
+    # Import here so the parent and the extraction workers never load torch
+    from embedding_cache import EmbeddingCache
+    from fingerprint import LexicalIndex
+    from plagiarism_checker_multilingual import MultilingualPlagiarismDetector
+
+    cache_path = detector_kwargs.pop('cache_path', None)
+    cache = EmbeddingCache(cache_path, max_memory_items=200000)
+    _detector = MultilingualPlagiarismDetector(cache=cache, **detector_kwargs)
+    _reference_texts = reference_texts
+
+    if lexical_prune:
+        _lexical_index = LexicalIndex(_detector.fingerprinter)
+        for path, text in reference_texts.items():
+            _lexical_index.add_document(path, _detector.split_into_sentences(text))
+
+
+def _is_plausible(submission, submission_text, reference):
+    global _candidates
+    if _lexical_index is None:
+        return True
+    # Pairs of one submission usually arrive together; remember its candidate set
+    if _candidates[0] != submission:
+        sentences = _detector.split_into_sentences(submission_text)
+        _candidates = (submission, _lexical_index.candidate_documents(sentences))
+    return reference in _candidates[1]
+
+
+def _compare_pair(submission, submission_text, reference, threshold):
+    start = time.perf_counter()
+    record = {'submission': submission, 'reference': reference}
+
+    if not _is_plausible(submission, submission_text, reference):
+        record.update(plagiarism_percentage=0, matches=[], pruned=True)
+    else:
+        details = {}
+        pct, matches = _detector.check_plagiarism(submission_text, _reference_texts[reference], threshold,
+                                                  details=details)
+        record.update(plagiarism_percentage=pct, matches=matches,
+                      timings={stage: round(seconds, 4) for stage, seconds in details['timings'].items()})
+
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def _error_record(submission, reference, error):
+    return {'submission': submission, 'reference': reference, 'error': error}
+
+
+def run(submissions, references, output_path, threshold=0.8, extract_workers=None,
+        model_workers=1, detector_kwargs=None, max_in_flight=None, lexical_prune=False):
+    """
+    Compare every submission against every reference, streaming results
+
+    Returns:
+        number of pairs written by this run
+    """
+    done = load_completed_pairs(output_path)
+    pending = {}
+    for submission in submissions:
+        todo = [ref for ref in references if ref != submission and (submission, ref) not in done]
+        if todo:
+            pending[submission] = todo
+
+    total = sum(len(refs) for refs in pending.values())
+    logger.info("%d pairs to compare (%d already done)", total, len(done))
+    if not total:
+        return 0
+
+    max_in_flight = max_in_flight or model_workers * 8
+    written = 0
+
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(extract_workers) as extractor:
+
+        def emit(record):
+            nonlocal written
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+            written += 1
+
+        # References are needed by every model worker: extract them up front
+        needed_refs = sorted({ref for refs in pending.values() for ref in refs})
+        reference_texts = {}
+        reference_errors = {}
+        for path, text, error in extractor.map(try_extract_pages, needed_refs, chunksize=4):
+            if error:
+                reference_errors[path] = error
+            else:
+                reference_texts[path] = text
+
+        # Submissions are extracted in the background while comparisons run;
+        # only a small window of their texts is held in memory
+        submission_texts = _windowed_map(extractor, try_extract_pages, list(pending),
+                                         window=(extract_workers or os.cpu_count() or 1) * 2)
+
+        def start_models():
+            return ProcessPoolExecutor(model_workers, initializer=_init_model_worker,
+                                       initargs=(dict(detector_kwargs or {}), reference_texts, lexical_prune))
+
+        models = start_models()
+        in_flight = set()
+
+        def restart_models(broken):
+            nonlocal models
+            # Every in-flight future of a dead pool fails; only the first one replaces it
+            if broken is models:
+                logger.warning("A model worker died; restarting the model pool")
+                broken.shutdown(wait=False)
+                models = start_models()
+
+        def submit(args, attempt=1):
+            try:
+                future = models.submit(_compare_pair, *args)
+            except BrokenProcessPool:
+                restart_models(models)
+                future = models.submit(_compare_pair, *args)
+            future.args, future.attempt, future.pool = args, attempt, models
+            in_flight.add(future)
+
+        def drain(limit):
+            while len(in_flight) > limit:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    in_flight.discard(future)
+                    submission, _, reference, _ = future.args
+                    try:
+                        emit(future.result())
+                    except BrokenProcessPool as e:
+                        restart_models(future.pool)
+                        if future.attempt < MAX_PAIR_ATTEMPTS:
+                            submit(future.args, future.attempt + 1)
+                        else:
+                            emit(_error_record(submission, reference, f"{type(e).__name__}: {e}"))
+                    except Exception as e:
+                        emit(_error_record(submission, reference, f"{type(e).__name__}: {e}"))
+
+        try:
+            for submission, text, error in submission_texts:
+                for reference in pending.pop(submission):
+                    if error or reference in reference_errors:
+                        emit(_error_record(submission, reference, error or reference_errors[reference]))
+                        continue
+                    drain(max_in_flight - 1)
+                    submit((submission, text, reference, threshold))
+            drain(0)
+        finally:
+            models.shutdown()
+
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare submissions against references in bulk")
+    parser.add_argument("--submissions", required=True,
+                        help="directory of PDF/TXT files, or manifest file with one path per line")
+    parser.add_argument("--references", required=True,
+                        help="directory or manifest of reference documents")
+    parser.add_argument("--output", required=True, help="JSONL results file (appended to, resumable)")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--extract-workers", type=int, default=None,
+                        help="text extraction processes (default: CPU count)")
+    parser.add_argument("--model-workers", type=int, default=1,
+                        help="processes that each load one model")
+    parser.add_argument("--model", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                        help="Hugging Face model name or local path")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="intra-op threads per model worker")
+    parser.add_argument("--backend", default="torch", choices=("torch", "torch-int8", "onnx"))
+    parser.add_argument("--cache", default=None, help="SQLite embedding cache shared by runs")
+    parser.add_argument("--lexical-prune", action="store_true",
+                        help="skip pairs with no near-verbatim sentence overlap (misses translations)")
+    parser.add_argument("--hierarchical", action="store_true",
+                        help="match sentence windows first, then sentences only inside similar windows")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    detector_kwargs = {'model_name': args.model, 'backend': args.backend, 'num_threads': args.threads, 'cache_path': args.cache,
+                       'hierarchical': args.hierarchical}
+    start = time.perf_counter()
+    written = run(
+        list_documents(args.submissions),
+        list_documents(args.references),
+        args.output,
+        threshold=args.threshold,
+        extract_workers=args.extract_workers,
+        model_workers=args.model_workers,
+        detector_kwargs=detector_kwargs,
+        lexical_prune=args.lexical_prune,
+    )
+    logger.info("Wrote %d results in %.1fs", written, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from metrics import current_trace, share_trace
+
+
+class _Request:
+    """Sentences of one caller waiting to be encoded"""
+
+    def __init__(self, sentences):
+        self.sentences = sentences
+        # The caller's per-request trace; batches run on the scheduler thread record into it
+        self.trace = current_trace()
+        self.next_index = 0
+        self.done_count = 0
+        self.embeddings = None
+        self.error = None
+        self.finished = threading.Event()
+
+    @property
+    def remaining(self):
+        return len(self.sentences) - self.next_index
+
+
+class MicroBatchScheduler:
+    """
+    Dynamic micro-batching between concurrent callers and one model
+
+    Every caller's sentences go into a shared queue; a single background
+    thread owns the model and forms batches from all in-flight requests.
+    A batch is dispatched as soon as it holds max_batch_size sentences or
+    the oldest waiting sentence has waited max_wait_ms. Batch slots are
+    shared round-robin between requests, so a short document is not stuck
+    behind a long one.
+
+    Stages and counters recorded while a batch is encoded (tokenization,
+    forward passes, cache lookups) go to the trace of every request with
+    sentences in that batch, so they cover the whole shared batch.
+
+    Args:
+        encode_fn: function(list of sentences) -> (n, dim) array, e.g. detector.encode_batch
+            (called only from the scheduler thread)
+        max_batch_size: maximum sentences per dispatched batch
+        max_wait_ms: maximum time to wait for a batch to fill up
+    """
+
+    def __init__(self, encode_fn, max_batch_size=64, max_wait_ms=10):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._active = deque()
+        self._condition = threading.Condition()
+        self._oldest_arrival = None
+        self._closed = False
+
+        self.batches = 0
+        self.sentences = 0
+
+        self._worker = threading.Thread(target=self._run, name="micro-batch-scheduler", daemon=True)
+        self._worker.start()
+
+    def encode(self, sentences):
+        """Encode sentences through the shared batches (blocks until done)"""
+        request = _Request(list(sentences))
+        if not request.sentences:
+            return self.encode_fn([])
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            self._active.append(request)
+            if self._oldest_arrival is None:
+                self._oldest_arrival = time.monotonic()
+            self._condition.notify()
+
+        request.finished.wait()
+        if request.error is not None:
+            raise request.error
+        return request.embeddings
+
+    def close(self):
+        """Stop the worker after the queued work is finished"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'sentences': self.sentences,
+            'mean_batch_size': self.sentences / self.batches if self.batches else 0.0,
+        }
+
+    def _queued(self):
+        return sum(request.remaining for request in self._active)
+
+    def _next_batch(self):
+        """Wait for work, then take up to max_batch_size sentences round-robin"""
+        with self._condition:
+            while not self._active and not self._closed:
+                self._condition.wait()
+            if not self._active:
+                return None
+
+            # Let the batch fill up until it is full or the oldest sentence is due
+            while not self._closed and self._queued() < self.max_batch_size:
+                remaining = self._oldest_arrival + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            parts = []
+            capacity = self.max_batch_size
+            while capacity and self._active:
+                share = max(1, capacity // len(self._active))
+                for request in list(self._active):
+                    take = min(share, capacity, request.remaining)
+                    if take == 0:
+                        continue
+                    parts.append((request, request.next_index, take))
+                    request.next_index += take
+                    capacity -= take
+                    if not request.remaining:
+                        self._active.remove(request)
+                    if not capacity:
+                        break
+
+            # Leftovers have already waited, so they are due immediately
+            self._oldest_arrival = time.monotonic() - self.max_wait if self._active else None
+            return parts
+
+    def _run(self):
+        while True:
+            parts = self._next_batch()
+            if parts is None:
+                return
+
+            batch = [s for request, start, count in parts for s in request.sentences[start:start + count]]
+            try:
+                with share_trace(request.trace for request, _, _ in parts):
+                    embeddings = self.encode_fn(batch)
+            except Exception as e:
+                # The callers raise at once; stop batching what is left of their sentences
+                with self._condition:
+                    for request, _, _ in parts:
+                        if request.error is None and request in self._active:
+                            self._active.remove(request)
+                        request.error = e
+                    if not self._active:
+                        self._oldest_arrival = None
+                for request, _, _ in parts:
+                    request.finished.set()
+                continue
+
+            self.batches += 1
+            self.sentences += len(batch)
+
+            offset = 0
+            for request, start, count in parts:
+                if request.embeddings is None:
+                    request.embeddings = np.empty((len(request.sentences), embeddings.shape[1]),
+                                                  dtype=embeddings.dtype)
+                request.embeddings[start:start + count] = embeddings[offset:offset + count]
+                offset += count
+                request.done_count += count
+                if request.done_count == len(request.sentences):
+                    request.finished.set()
+
+
+def simulate_load(encode_fn, documents, users=20, scheduler=None):
+    """
+    Encode documents from `users` concurrent threads
+
+    Returns:
+        dict with throughput (sentences/sec) and p50/p99 request latency (s)
+    """
+    latencies = []
+    lock = threading.Lock()
+    encode = scheduler.encode if scheduler is not None else encode_fn
+    # Without a scheduler, callers share the model through a lock (like one detector in the app)
+    model_lock = threading.Lock() if scheduler is None else None
+
+    def user(doc_index):
+        sentences = documents[doc_index % len(documents)]
+        start = time.perf_counter()
+        if model_lock is not None:
+            with model_lock:
+                encode(sentences)
+        else:
+            encode(sentences)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(documents[i % len(documents)]) for i in range(users))
+    return {
+        'sentences_per_sec': total / elapsed,
+        'p50_latency': float(np.percentile(latencies, 50)),
+        'p99_latency': float(np.percentile(latencies, 99)),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+
+    from plagiarism_checker_multilingual import MultilingualPlagiarismDetector
+
+    parser = argparse.ArgumentParser(description="Compare per-request encoding with micro-batching")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--model", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    args = parser.parse_args()
+
+    detector = MultilingualPlagiarismDetector(args.model)
+    words = "the model compares every sentence of both documents and reports the closest match".split()
+    rng = random.Random(0)
+    documents = [[" ".join(rng.choice(words) for _ in range(rng.randint(8, 30)))
+                  for _ in range(rng.randint(5, 60))] for _ in range(args.users)]
+
+    # Small per-caller batches, like separate requests each running their own forward passes
+    baseline = simulate_load(lambda s: detector.encode_batch(s, batch_size=8), documents, args.users)
+    scheduler = MicroBatchScheduler(lambda s: detector.encode_batch(s, batch_size=args.max_batch_size),
+                                    args.max_batch_size, args.max_wait_ms)
+    batched = simulate_load(None, documents, args.users, scheduler)
+    scheduler.close()
+
+    for name, result in (("per-request", baseline), ("micro-batched", batched)):
+        print(f"{name:14s} {result['sentences_per_sec']:8.1f} sentences/s   "
+              f"p50 {result['p50_latency']:.3f}s   p99 {result['p99_latency']:.3f}s")
+    print(f"Scheduler: {scheduler.stats()}")
@@ -0,0 +1,504 @@
+"""
+Reproducible performance benchmarks for the detector
+
+Generates seeded synthetic corpora (English, Tamil, Hindi and mixed-script)
+at several sizes and times every stage separately: PDF extraction, sentence
+splitting, tokenization, model forward, similarity and report rendering.
+Results (sentences/sec, p50/p95/p99 latency, peak RSS, cold start) are
+written as JSON and can be checked against a stored baseline:
+
+    python benchmark.py --output results.json --save-baseline baseline.json
+    python benchmark.py --output results.json --baseline baseline.json
+
+With --draft-layers or --draft-model, the model cascade is also measured:
+check_plagiarism throughput with and without it, and how many flagged
+sentences it gains or loses against the full model. The draft model is
+held to --draft-threshold, or with --calibrate-draft to a threshold
+calibrated on a differently seeded corpus of each language; the
+threshold used is reported.
+
+The model must already be in the local Hugging Face cache; nothing is
+downloaded.
+"""
+import os
+
+# Never touch the network: benchmarks run against the locally cached model
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# Sentences per synthetic document
+SIZES = {'small': 50, 'medium': 500, 'large': 5000}
+SENTENCES_PER_PAGE = 40
+
+# Latency changes smaller than this are timer noise, never regressions
+MIN_REGRESSION_SECONDS = 0.001
+
+STAGES = ('extraction', 'segmentation', 'tokenization', 'forward', 'similarity', 'rendering')
+
+VOCABULARY = {
+    'english': (
+        "machine learning is a subset of artificial intelligence that enables computers to learn "
+        "from data without being explicitly programmed the model compares every sentence of both "
+        "documents and reports the closest match students submit research papers for review"
+    ).split(),
+    'tamil': (
+        "இயந்திர கற்றல் செயற்கை நுண்ணறிவின் ஒரு பகுதி இது கணினிகள் தரவுகளிலிருந்து "
+        "கற்றுக்கொள்ள உதவுகிறது அமைப்புகளை தானாக கற்க அனுமதிக்கிறது தொழில்நுட்பத்தின் "
+        "பகுதியாகும் மாணவர்கள் ஆய்வு கட்டுரை பல்கலைக்கழகம் முடிவுகள் முக்கியமான"
+    ).split(),
+    'hindi': (
+        "मशीन लर्निंग कृत्रिम बुद्धिमत्ता का एक हिस्सा है यह कंप्यूटर को डेटा से सीखने में मदद "
+        "करता प्रणाली स्वचालित रूप अनुसंधान विश्लेषण परिणाम महत्वपूर्ण छात्र विश्वविद्यालय लेख"
+    ).split(),
+}
+TERMINATORS = {'english': '.', 'tamil': '.', 'hindi': '।'}
+LANGUAGES = ('english', 'tamil', 'hindi', 'mixed')
+
+COLD_START_CODE = """
+import sys, time
+start = time.perf_counter()
+from plagiarism_checker_multilingual import MultilingualPlagiarismDetector
+detector = MultilingualPlagiarismDetector(sys.argv[1], backend=sys.argv[2])
+detector.encode_batch(["The first request pays for any lazy initialization."])
+print("COLD_START", time.perf_counter() - start)
+"""
+
+
+def _sentence(rng, language):
+    if language == 'mixed':
+        # Code-switched sentence with words from every script
+        words = [rng.choice(VOCABULARY[rng.choice(tuple(VOCABULARY))]) for _ in range(rng.randint(6, 24))]
+        return " ".join(words) + rng.choice(tuple(TERMINATORS.values()))
+    words = [rng.choice(VOCABULARY[language]) for _ in range(rng.randint(6, 24))]
+    return " ".join(words) + TERMINATORS[language]
+
+
+def _perturb(rng, sentence, language):
+    words = sentence[:-1].split()
+    vocabulary = VOCABULARY['english' if language == 'mixed' else language]
+    for _ in range(2):
+        words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    return " ".join(words) + sentence[-1]
+
+
+def generate_corpus(language, num_sentences, seed=0):
+    """
+    Seeded synthetic document pair
+
+    The second document copies 30% of the first verbatim, 30% with a few
+    words replaced, and fills the rest with fresh sentences, in shuffled
+    order, so both the lexical and the semantic stage find matches.
+
+    Returns:
+        (pages1, pages2): lists of page texts
+    """
+    rng = random.Random(f"{language}-{num_sentences}-{seed}")
+    sentences1 = [_sentence(rng, language) for _ in range(num_sentences)]
+    sentences2 = []
+    for sentence in sentences1:
+        roll = rng.random()
+        if roll < 0.3:
+            sentences2.append(sentence)
+        elif roll < 0.6:
+            sentences2.append(_perturb(rng, sentence, language))
+        else:
+            sentences2.append(_sentence(rng, language))
+    rng.shuffle(sentences2)
+
+    def paginate(sentences):
+        return [" ".join(sentences[i:i + SENTENCES_PER_PAGE])
+                for i in range(0, len(sentences), SENTENCES_PER_PAGE)]
+
+    return paginate(sentences1), paginate(sentences2)
+
+
+def write_pdf(path, pages, line_width=90):
+    """
+    Minimal PDF with one text page per entry (standard Helvetica font)
+
+    Non-Latin characters cannot be drawn without an embedded font and are
+    written as '?'; page count and text volume still match the corpus.
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in pages:
+        words, lines, line = page.split(), [], ""
+        for word in words:
+            if line and len(line) + len(word) + 1 > line_width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+
+        text = "".join(
+            "(" + l.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T* "
+            for l in lines
+        ).encode('latin-1', 'replace')
+        stream = b"BT /F1 9 Tf 11 TL 40 810 Td " + text + b"ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+def reset_peak_rss():
+    """
+    Restart the peak RSS high-water mark at the current RSS
+
+    Only Linux supports this (via /proc/self/clear_refs). Returns the scope
+    peak_rss_mb() reports from now on: 'stage' after a reset, 'process'
+    (the whole process lifetime) where the mark cannot be reset.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return 'stage'
+    except OSError:
+        return 'process'
+
+
+def peak_rss_mb():
+    """Peak resident set size since the last reset_peak_rss() (or of the whole process)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(fn, repeats, warmup=1):
+    """
+    Run fn warmup + repeats times; returns latencies of the timed runs and the last result
+
+    The peak RSS high-water mark is reset first where possible, so the
+    following summarize() reports the peak of this stage alone.
+    """
+    global _rss_scope
+    _rss_scope = reset_peak_rss()
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies, result
+
+
+# Scope of the peak RSS recorded by the last measure() call (see reset_peak_rss)
+_rss_scope = 'process'
+
+
+def summarize(latencies, sentences):
+    latencies = np.asarray(latencies)
+    p50 = float(np.percentile(latencies, 50))
+    return {
+        'runs': len(latencies),
+        'sentences': sentences,
+        'mean': float(latencies.mean()),
+        'p50': p50,
+        'p95': float(np.percentile(latencies, 95)),
+        'p99': float(np.percentile(latencies, 99)),
+        'sentences_per_sec': sentences / p50 if p50 > 0 else float('inf'),
+        'peak_rss_mb': peak_rss_mb(),
+        # 'stage': peak while this stage ran; 'process': process-lifetime peak so far
+        'peak_rss_scope': _rss_scope,
+    }
+
+
+def measure_cold_start(model_name, backend):
+    """Import + model load + first encode, in a fresh interpreter (seconds)"""
+    completed = subprocess.run(
+        [sys.executable, "-c", COLD_START_CODE, model_name, backend],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith("COLD_START "):
+            return float(line.split()[1])
+    raise RuntimeError(f"Cold start run printed no timing:\n{completed.stdout}{completed.stderr}")
+
+
+def benchmark_corpus(detector, language, size, repeats, batch_size=32, threshold=0.8):
+    """Time every stage on one synthetic corpus; returns one measurement dict per stage"""
+    from report import render_matches, render_report
+    from similarity import best_matches
+    from text_extraction import clear_memory_cache, extract_pages
+
+    num_sentences = SIZES[size]
+    pages1, pages2 = generate_corpus(language, num_sentences)
+    measurements = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "document.pdf")
+        write_pdf(pdf_path, pages1)
+
+        def extract():
+            # Parse every time: no memory or disk cache
+            clear_memory_cache()
+            return extract_pages(pdf_path, cache_dir=None)
+
+        latencies, _ = measure(extract, repeats)
+        measurements['extraction'] = summarize(latencies, num_sentences)
+
+    latencies, sentences1 = measure(lambda: detector.split_into_sentences(pages1), repeats)
+    measurements['segmentation'] = summarize(latencies, len(sentences1))
+    sentences2 = detector.split_into_sentences(pages2)
+
+    def tokenize():
+        return detector.tokenizer(sentences1, truncation=True, max_length=512)
+
+    latencies, encoded = measure(tokenize, repeats)
+    measurements['tokenization'] = summarize(latencies, len(sentences1))
+
+    # Same length-bucketed padded batches as encode_batch, prepared outside the timer
+    lengths = np.array([len(ids) for ids in encoded['input_ids']])
+    order = np.argsort(-lengths, kind='stable')
+    batches = []
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start + batch_size]
+        features = {key: [encoded[key][i] for i in batch_idx] for key in encoded.keys()}
+        batches.append(detector.tokenizer.pad(features, padding=True, return_tensors="pt"))
+
+    def forward():
+        return np.concatenate([detector.embed_inputs(inputs) for inputs in batches])
+
+    latencies, _ = measure(forward, repeats)
+    measurements['forward'] = summarize(latencies, len(sentences1))
+
+    embeddings1 = detector.encode_batch(sentences1, batch_size)
+    embeddings2 = detector.encode_batch(sentences2, batch_size)
+    latencies, _ = measure(lambda: best_matches(embeddings1, embeddings2,
+                                                memory_limit_mb=detector.similarity_memory_mb), repeats)
+    measurements['similarity'] = summarize(latencies, len(sentences1))
+
+    pct, matches = detector.check_plagiarism(pages1, pages2, threshold)
+    latencies, _ = measure(lambda: (render_report(pct, matches, len(sentences1), threshold),
+                                    render_matches(matches)), repeats)
+    measurements['rendering'] = summarize(latencies, len(sentences1))
+
+    return [{'language': language, 'size': size, 'stage': stage, **measurements[stage]}
+            for stage in STAGES]
+
+
+def benchmark_cascade(detector, language, size, repeats, threshold=0.8, calibrate=False):
+    """
+    check_plagiarism with and without the model cascade on one synthetic corpus
+
+    With calibrate=True, the draft threshold is first calibrated on another
+    seed of the same language and size (detector.calibrate_draft).
+
+    Returns:
+        dict with both throughputs, the speedup, the agreement of flagged
+        sentences, how many sentences each tier decided and the thresholds used
+    """
+    num_sentences = SIZES[size]
+    if calibrate:
+        sample1, sample2 = generate_corpus(language, num_sentences, seed=1)
+        detector.calibrate_draft(sample1, sample2, threshold)
+    pages1, pages2 = generate_corpus(language, num_sentences)
+    latencies, (_, full_matches) = measure(
+        lambda: detector.check_plagiarism(pages1, pages2, threshold, cascade=False), repeats)
+    full = summarize(latencies, num_sentences)
+    details = {}
+    latencies, (_, cascade_matches) = measure(
+        lambda: detector.check_plagiarism(pages1, pages2, threshold, cascade=True, details=details), repeats)
+    cascaded = summarize(latencies, num_sentences)
+    stats = details['stats']
+
+    expected = {match['sentence_num'] for match in full_matches}
+    flagged = {match['sentence_num'] for match in cascade_matches}
+    return {
+        'language': language,
+        'size': size,
+        'full_sentences_per_sec': full['sentences_per_sec'],
+        'cascade_sentences_per_sec': cascaded['sentences_per_sec'],
+        'speedup': full['p50'] / cascaded['p50'] if cascaded['p50'] > 0 else float('inf'),
+        'recall': len(expected & flagged) / len(expected) if expected else 1.0,
+        'missed': len(expected - flagged),
+        'added': len(flagged - expected),
+        'threshold': threshold,
+        'draft_threshold': threshold if detector.draft_threshold is None else detector.draft_threshold,
+        'draft_calibrated': calibrate,
+        'draft_decided': stats.get('draft_decided', 0),
+        'full_decided': stats.get('full_decided', 0),
+    }
+
+
+def environment():
+    import torch
+    import transformers
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'transformers': transformers.__version__,
+    }
+
+
+def compare_to_baseline(results, baseline, max_slowdown=0.2, max_memory_growth=0.2):
+    """
+    Regressions of results against a baseline run
+
+    A stage regresses when its p50 latency grows by more than max_slowdown
+    (0.2 = 20%, ignoring sub-millisecond differences) or its peak RSS by
+    more than max_memory_growth; cold start is held to the same limit.
+    Peak RSS is only compared per stage when both runs measured it per
+    stage; a process-lifetime peak carries over from the largest earlier
+    stage, so it is only compared once, as the overall peak.
+
+    Returns:
+        list of human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    reference = {(m['language'], m['size'], m['stage']): m for m in baseline['measurements']}
+    for m in results['measurements']:
+        base = reference.get((m['language'], m['size'], m['stage']))
+        if base is None:
+            continue
+        name = f"{m['language']}/{m['size']}/{m['stage']}"
+        if m['p50'] > base['p50'] * (1 + max_slowdown) and m['p50'] - base['p50'] > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{name}: p50 {base['p50'] * 1000:.2f}ms -> {m['p50'] * 1000:.2f}ms")
+        per_stage = m.get('peak_rss_scope') == base.get('peak_rss_scope') == 'stage'
+        if per_stage and m['peak_rss_mb'] > base['peak_rss_mb'] * (1 + max_memory_growth):
+            regressions.append(f"{name}: peak RSS {base['peak_rss_mb']:.0f}MB -> {m['peak_rss_mb']:.0f}MB")
+
+    if not all(m.get('peak_rss_scope') == 'stage' for m in results['measurements'] + baseline['measurements']):
+        base_peak = max((m['peak_rss_mb'] for m in baseline['measurements']), default=0)
+        peak = max((m['peak_rss_mb'] for m in results['measurements']), default=0)
+        if base_peak and peak > base_peak * (1 + max_memory_growth):
+            regressions.append(f"overall: peak RSS {base_peak:.0f}MB -> {peak:.0f}MB")
+
+    base_cold, cold = baseline.get('cold_start_seconds'), results.get('cold_start_seconds')
+    if base_cold and cold and cold > base_cold * (1 + max_slowdown):
+        regressions.append(f"cold start: {base_cold:.2f}s -> {cold:.2f}s")
+    return regressions
+
+
+def run(model_name=DEFAULT_MODEL, backend="torch", languages=LANGUAGES, sizes=('small', 'medium'),
+        repeats=5, cold_start=True, draft_model=None, draft_layers=None, draft_threshold=None,
+        calibrate_draft=False):
+    """Run the whole suite and return the results dict"""
+    results = {
+        'model': model_name,
+        'backend': backend,
+        'repeats': repeats,
+        'environment': environment(),
+        'cold_start_seconds': measure_cold_start(model_name, backend) if cold_start else None,
+        'measurements': [],
+    }
+
+    from plagiarism_checker_multilingual import MultilingualPlagiarismDetector
+    # No embedding cache and no lexical prefilter: every stage does its full work
+    detector = MultilingualPlagiarismDetector(model_name, backend=backend, prefilter=False,
+                                              draft_model=draft_model, draft_layers=draft_layers,
+                                              draft_threshold=draft_threshold)
+    for size in sizes:
+        for language in languages:
+            for m in benchmark_corpus(detector, language, size, repeats):
+                results['measurements'].append(m)
+                print(f"{language:8s} {size:7s} {m['stage']:13s} {m['sentences_per_sec']:10.1f} sent/s   "
+                      f"p50 {m['p50'] * 1000:9.2f}ms  p95 {m['p95'] * 1000:9.2f}ms  "
+                      f"p99 {m['p99'] * 1000:9.2f}ms  peak RSS {m['peak_rss_mb']:.0f}MB")
+
+    if detector.draft is not None:
+        results['draft_model'] = draft_model or model_name
+        results['draft_layers'] = draft_layers
+        results['cascade'] = []
+        for size in sizes:
+            for language in languages:
+                c = benchmark_cascade(detector, language, size, repeats, calibrate=calibrate_draft)
+                results['cascade'].append(c)
+                print(f"{language:8s} {size:7s} cascade       {c['cascade_sentences_per_sec']:10.1f} sent/s   "
+                      f"full {c['full_sentences_per_sec']:.1f} sent/s  x{c['speedup']:.2f}  "
+                      f"recall {c['recall']:.3f} (-{c['missed']} +{c['added']})  "
+                      f"draft/full decided {c['draft_decided']}/{c['full_decided']}  "
+                      f"draft threshold {c['draft_threshold']:.3f}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the plagiarism detector")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backend", default="torch", choices=("torch", "torch-int8", "onnx"))
+    parser.add_argument("--languages", default=",".join(LANGUAGES))
+    parser.add_argument("--sizes", default="small,medium", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--no-cold-start", action="store_true", help="skip the fresh-process cold start run")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="fail (exit 1) on regressions against this results file")
+    parser.add_argument("--save-baseline", help="also write the results to this baseline file")
+    parser.add_argument("--max-slowdown", type=float, default=0.2)
+    parser.add_argument("--max-memory-growth", type=float, default=0.2)
+    parser.add_argument("--draft-model", default=None, help="also measure the cascade with this draft model")
+    parser.add_argument("--draft-layers", type=int, default=None,
+                        help="also measure the cascade with a draft of this many layers")
+    parser.add_argument("--draft-threshold", type=float, default=None,
+                        help="draft score standing for the 0.8 threshold (default: 0.8 itself)")
+    parser.add_argument("--calibrate-draft", action="store_true",
+                        help="calibrate the draft threshold per language and size before measuring")
+    args = parser.parse_args()
+
+    results = run(args.model, args.backend, args.languages.split(","), args.sizes.split(","),
+                  args.repeats, cold_start=not args.no_cold_start,
+                  draft_model=args.draft_model, draft_layers=args.draft_layers,
+                  draft_threshold=args.draft_threshold, calibrate_draft=args.calibrate_draft)
+    if results['cold_start_seconds'] is not None:
+        print(f"Cold start: {results['cold_start_seconds']:.2f}s")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['environment'] != results['environment']:
+            print("Warning: baseline was recorded in a different environment")
+        regressions = compare_to_baseline(results, baseline, args.max_slowdown, args.max_memory_growth)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
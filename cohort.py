@@ -0,0 +1,324 @@
+"""
+Cohort mode: all-pairs collusion detection within one class of submissions
+
+Every submission is split and embedded exactly once (sentences shared by
+several submissions are encoded once), all sentence embeddings are stacked,
+and one blocked self-join finds every cross-document sentence pair above the
+threshold. Only the upper triangle of the similarity matrix is computed,
+tile by tile, and same-document pairs are dropped; a class of 500
+submissions takes one encoding pass plus a few minutes of BLAS on one CPU
+box instead of 125,000 pairwise comparisons:
+
+    python cohort.py --submissions class_2024/ --output-dir cohort_report/ --threshold 0.85
+
+Writes similarity.csv (document-by-document matrix: share of the row
+document's sentences that have a match in the column document) and
+clusters.json (groups of likely colluding submissions with example
+sentence pairs).
+
+Text every student was given (the assignment prompt) would tie the whole
+class together: pass it with --template, and sentences matched in more than
+--boilerplate-fraction of the cohort are ignored as well.
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_compare import list_documents
+from embedding_store import normalize_rows
+from metrics import metrics
+from segmentation import iter_sentences
+from similarity import best_matches, tile_shape
+from text_extraction import extract_pages, try_extract_pages
+
+logger = logging.getLogger(__name__)
+
+# document_ids: ids in matrix order
+# similarity: (n_docs, n_docs) share of row document sentences matched in the column document
+# sentence_counts: sentences per document that were compared (boilerplate excluded)
+# clusters: list of cluster dicts, most similar first
+# timings: seconds spent per stage ('encoding', 'similarity')
+CohortResult = namedtuple('CohortResult', ['document_ids', 'similarity', 'sentence_counts', 'clusters', 'timings'])
+
+
+def embed_cohort(detector, documents, chunk_size=1024):
+    """
+    Split and embed every document once
+
+    Args:
+        detector: MultilingualPlagiarismDetector
+        documents: dict of document id -> text (or list of page texts)
+        chunk_size: sentences encoded per progress step
+
+    Returns:
+        segments: list (per document) of Sentence tuples
+        embeddings: L2-normalized float32 array (total sentences, dim), document by document
+        sentence_doc: (total sentences,) document index of every row
+    """
+    with metrics.timer('segmentation'):
+        segments = [list(iter_sentences(text)) for text in documents.values()]
+
+    # Shared sentences (copied or given text) are encoded once for the whole cohort
+    unique = {}
+    rows = [unique.setdefault(s.text, len(unique)) for doc in segments for s in doc]
+    texts = list(unique)
+    logger.info("Embedding %d sentences (%d unique) of %d documents", len(rows), len(texts), len(segments))
+
+    chunks = []
+    done = 0
+    for chunk, embeddings in detector.encode_stream(texts, chunk_size=chunk_size):
+        chunks.append(embeddings)
+        done += len(chunk)
+        logger.info("Embedded %d/%d unique sentences", done, len(texts))
+
+    if not texts:
+        return segments, np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    embeddings = normalize_rows(np.concatenate(chunks))[np.asarray(rows, dtype=np.int64)]
+    sentence_doc = np.repeat(np.arange(len(segments)), [len(doc) for doc in segments])
+    return segments, embeddings, sentence_doc
+
+
+def cross_document_pairs(embeddings, sentence_doc, threshold, memory_limit_mb=256):
+    """
+    Every pair of sentences from different documents scoring >= threshold
+
+    Blocked self-join over the upper triangle of embeddings @ embeddings.T:
+    each tile is one BLAS matmul and only its hits are kept, so memory is
+    bounded by memory_limit_mb plus the hits themselves.
+
+    Args:
+        embeddings: L2-normalized (n, dim) array
+        sentence_doc: (n,) document index of every row
+        threshold: minimum cosine similarity
+
+    Returns:
+        rows, cols, scores: arrays of hits with rows < cols
+    """
+    n = len(embeddings)
+    side = min(tile_shape(n, n, memory_limit_mb)) if n else 1
+    found_rows, found_cols, found_scores = [], [], []
+    for r0 in range(0, n, side):
+        r1 = min(r0 + side, n)
+        for c0 in range(r0, n, side):
+            c1 = min(c0 + side, n)
+            # Sentences are grouped by document: a tile inside one document has no pairs to report
+            if sentence_doc[r0] == sentence_doc[r1 - 1] == sentence_doc[c0] == sentence_doc[c1 - 1]:
+                continue
+            tile = embeddings[r0:r1] @ embeddings[c0:c1].T
+            rows, cols = np.nonzero(tile >= threshold)
+            scores = tile[rows, cols]
+            rows += r0
+            cols += c0
+            keep = sentence_doc[rows] != sentence_doc[cols]
+            if c0 == r0:
+                keep &= rows < cols
+            found_rows.append(rows[keep])
+            found_cols.append(cols[keep])
+            found_scores.append(scores[keep])
+
+    if not found_rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(found_rows), np.concatenate(found_cols), np.concatenate(found_scores)
+
+
+def _clusters(document_ids, similarity, min_similarity):
+    """Connected components of the graph of document pairs with similarity >= min_similarity"""
+    n = len(document_ids)
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    # A short submission copied into a long one counts, so take the larger direction
+    pair_similarity = np.maximum(similarity, similarity.T)
+    edges = [(a, b) for a, b in zip(*np.nonzero(np.triu(pair_similarity >= min_similarity, 1)))]
+    for a, b in edges:
+        parent[find(a)] = find(b)
+
+    members = {}
+    for a, b in edges:
+        members.setdefault(find(a), set()).update((a, b))
+
+    clusters = []
+    for root, docs in members.items():
+        docs = sorted(docs)
+        pairs = [{'documents': [document_ids[a], document_ids[b]],
+                  'similarity': float(pair_similarity[a, b]),
+                  'coverage': [float(similarity[a, b]), float(similarity[b, a])],
+                  'indices': (a, b)}
+                 for a, b in edges if find(a) == root]
+        pairs.sort(key=lambda pair: -pair['similarity'])
+        clusters.append({'documents': [document_ids[d] for d in docs],
+                         'max_similarity': pairs[0]['similarity'],
+                         'pairs': pairs})
+    clusters.sort(key=lambda cluster: (-cluster['max_similarity'], -len(cluster['documents'])))
+    return clusters
+
+
+def detect_collusion(detector, documents, threshold=0.85, cluster_threshold=0.3, template=None,
+                     boilerplate_fraction=0.1, memory_limit_mb=256, examples=5):
+    """
+    Document-by-document similarity and collusion clusters for a cohort
+
+    Args:
+        detector: MultilingualPlagiarismDetector
+        documents: dict of document id -> text (or list of page texts)
+        threshold: cosine similarity for two sentences to match
+        cluster_threshold: share of sentences (of either document of a pair)
+            matched in the other for the pair to join a cluster
+        template: text given to every student (e.g. the assignment); sentences
+            matching it are ignored
+        boilerplate_fraction: sentences matched in more than this share of the
+            other documents (at least 2) are ignored as shared boilerplate
+        memory_limit_mb: memory budget for similarity tiles
+        examples: sentence pairs reported per clustered document pair
+
+    Returns:
+        CohortResult
+    """
+    document_ids = list(documents)
+    n_docs = len(document_ids)
+    timings = {}
+
+    start = time.perf_counter()
+    with metrics.timer('encoding'):
+        segments, embeddings, sentence_doc = embed_cohort(detector, documents)
+    timings['encoding'] = time.perf_counter() - start
+
+    excluded = np.zeros(len(embeddings), dtype=bool)
+    if template and len(embeddings):
+        template_sentences = [s.text for s in iter_sentences(template)]
+        if template_sentences:
+            given = best_matches(embeddings, detector.encode_batch(template_sentences),
+                                 memory_limit_mb=memory_limit_mb)
+            excluded |= given.row_scores[:, 0] >= threshold
+
+    start = time.perf_counter()
+    with metrics.timer('similarity'):
+        rows, cols, scores = cross_document_pairs(embeddings, sentence_doc, threshold, memory_limit_mb)
+    timings['similarity'] = time.perf_counter() - start
+    logger.info("Found %d cross-document sentence pairs in %.1fs", len(scores), timings['similarity'])
+
+    # Which documents each sentence has a match in (both directions of every pair)
+    sentences = np.concatenate([rows, cols])
+    matched_docs = np.concatenate([sentence_doc[cols], sentence_doc[rows]])
+    hits = np.unique(sentences * n_docs + matched_docs)
+    hit_sentences, hit_docs = hits // n_docs, hits % n_docs
+
+    max_shared = max(2, math.ceil(boilerplate_fraction * (n_docs - 1)))
+    shared = np.bincount(hit_sentences, minlength=len(embeddings)) > max_shared
+    excluded |= shared
+    if excluded.any():
+        logger.info("Ignoring %d template/boilerplate sentences", int(excluded.sum()))
+
+    keep = ~excluded[hit_sentences]
+    counts = np.zeros((n_docs, n_docs), dtype=np.int64)
+    np.add.at(counts, (sentence_doc[hit_sentences[keep]], hit_docs[keep]), 1)
+    sentence_counts = np.bincount(sentence_doc[~excluded], minlength=n_docs)
+    similarity = counts / np.maximum(sentence_counts, 1)[:, None]
+    np.fill_diagonal(similarity, 1.0)
+
+    clusters = _clusters(document_ids, similarity, cluster_threshold)
+
+    # Strongest sentence pairs of every clustered document pair, as evidence
+    offsets = np.concatenate([[0], np.cumsum([len(doc) for doc in segments])])
+    wanted = {pair['indices']: pair for cluster in clusters for pair in cluster['pairs']}
+    for pair in wanted.values():
+        pair['examples'] = []
+    clustered = np.zeros((n_docs, n_docs), dtype=bool)
+    for a, b in wanted:
+        clustered[a, b] = True
+    pair_rows = np.flatnonzero(clustered[sentence_doc[rows], sentence_doc[cols]] & ~excluded[rows] & ~excluded[cols])
+    for index in pair_rows[np.argsort(-scores[pair_rows], kind='stable')]:
+        i, j = rows[index], cols[index]
+        a, b = sentence_doc[i], sentence_doc[j]
+        pair = wanted[a, b]
+        if len(pair['examples']) >= examples:
+            continue
+        first, second = segments[a][i - offsets[a]], segments[b][j - offsets[b]]
+        pair['examples'].append({
+            'similarity': float(scores[index]),
+            'sentences': [first.text, second.text],
+            'sentence_nums': [int(i - offsets[a]) + 1, int(j - offsets[b]) + 1],
+            'pages': [first.page, second.page],
+        })
+    for pair in wanted.values():
+        del pair['indices']
+
+    return CohortResult(document_ids, similarity, sentence_counts, clusters, timings)
+
+
+def write_report(result, output_dir):
+    """Write similarity.csv and clusters.json to output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'similarity.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['document', 'sentences'] + result.document_ids)
+        for doc_id, count, row in zip(result.document_ids, result.sentence_counts, result.similarity):
+            writer.writerow([doc_id, int(count)] + [f"{value:.4f}" for value in row])
+    with open(os.path.join(output_dir, 'clusters.json'), 'w', encoding='utf-8') as f:
+        json.dump(result.clusters, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find colluding submissions within one cohort")
+    parser.add_argument("--submissions", required=True,
+                        help="directory of PDF/TXT files, or manifest file with one path per line")
+    parser.add_argument("--output-dir", required=True, help="directory for similarity.csv and clusters.json")
+    parser.add_argument("--threshold", type=float, default=0.85, help="sentence similarity threshold")
+    parser.add_argument("--cluster-threshold", type=float, default=0.3,
+                        help="share of matched sentences for two submissions to be clustered")
+    parser.add_argument("--template", default=None,
+                        help="PDF/TXT handed out to every student; its sentences are ignored")
+    parser.add_argument("--boilerplate-fraction", type=float, default=0.1,
+                        help="ignore sentences matched in more than this share of the cohort")
+    parser.add_argument("--memory-mb", type=int, default=256, help="memory budget for similarity tiles")
+    parser.add_argument("--extract-workers", type=int, default=None,
+                        help="text extraction processes (default: CPU count)")
+    parser.add_argument("--model", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                        help="Hugging Face model name or local path")
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads")
+    parser.add_argument("--backend", default="torch", choices=("torch", "torch-int8", "onnx"))
+    parser.add_argument("--cache", default=None, help="SQLite embedding cache shared by runs")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from embedding_cache import EmbeddingCache
+    from plagiarism_checker_multilingual import MultilingualPlagiarismDetector
+
+    start = time.perf_counter()
+    documents = {}
+    with ProcessPoolExecutor(args.extract_workers) as extractor:
+        for path, pages, error in extractor.map(try_extract_pages, list_documents(args.submissions), chunksize=4):
+            if error:
+                logger.warning("Skipping %s: %s", path, error)
+            else:
+                documents[path] = pages
+    template = extract_pages(args.template, workers=1) if args.template else None
+    logger.info("Extracted %d documents in %.1fs", len(documents), time.perf_counter() - start)
+
+    detector = MultilingualPlagiarismDetector(model_name=args.model, backend=args.backend, num_threads=args.threads,
+                                              cache=EmbeddingCache(args.cache, max_memory_items=200000))
+    result = detect_collusion(detector, documents, threshold=args.threshold,
+                              cluster_threshold=args.cluster_threshold, template=template,
+                              boilerplate_fraction=args.boilerplate_fraction, memory_limit_mb=args.memory_mb)
+    write_report(result, args.output_dir)
+    logger.info("Stage timings: %s", ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in result.timings.items()))
+    logger.info("%d clusters of likely collusion among %d submissions (%.1fs total)",
+                len(result.clusters), len(documents), time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import json
+import os
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, merge_top_k, normalize_rows
+from segmentation import iter_sentences
+
+
+def spherical_kmeans(vectors, n_clusters, n_iter=20, seed=0):
+    """
+    K-means on the unit sphere (cosine distance)
+
+    Args:
+        vectors: L2-normalized float32 array (n, dim)
+        n_clusters: number of centroids
+        n_iter: Lloyd iterations
+        seed: random seed for initialization
+
+    Returns:
+        L2-normalized centroids (n_clusters, dim)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class CorpusIndex:
+    """
+    Sentence-level index over a reference corpus
+
+    Reference documents are split and embedded once at ingest time. Queries
+    return the top-k most similar reference sentences for every sentence of
+    a submission.
+
+    Two search modes:
+    - "ivf": inverted-file index (spherical k-means coarse quantizer); only
+      the n_probe closest lists are scanned, so query time grows roughly with
+      the square root of the corpus size
+    - "exact": brute-force scan, used as ground truth for recall
+
+    Args:
+        detector: MultilingualPlagiarismDetector used for segmentation and encoding
+        mode: "ivf" or "exact"
+        n_lists: number of IVF lists (default: ~sqrt of corpus size)
+        n_probe: number of IVF lists scanned per query
+        dtype: storage type of the vectors ("float32", "float16" or "int8"),
+            see EmbeddingStore
+    """
+
+    def __init__(self, detector, mode="ivf", n_lists=None, n_probe=8, dtype="float32"):
+        if mode not in ("ivf", "exact"):
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        self.detector = detector
+        self.mode = mode
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.dtype = dtype
+
+        self.document_ids = []
+        self.sentences = []
+        self.sentence_doc = []
+        self.sentence_nums = []
+        self.sentence_pages = []
+        self._pending = []
+
+        self.store = None
+        self.centroids = None
+        self.list_offsets = None
+        self._trained = False
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def add_document(self, document_id, text):
+        """
+        Split, embed and store one reference document
+
+        text may also be a list of page texts. Sentences are encoded chunk
+        by chunk while the document is still being split.
+        """
+        sentences = []
+        pages = []
+        chunks = []
+        for chunk, embeddings in self.detector.encode_stream(iter_sentences(text)):
+            sentences.extend(segment.text for segment in chunk)
+            pages.extend(segment.page for segment in chunk)
+            chunks.append(embeddings)
+
+        if not sentences:
+            return 0
+
+        self.add_embeddings(document_id, sentences, np.concatenate(chunks), pages)
+        return len(sentences)
+
+    def add_embeddings(self, document_id, sentences, embeddings, pages=None):
+        """Store pre-computed sentence embeddings for one reference document"""
+        doc_idx = len(self.document_ids)
+        self.document_ids.append(document_id)
+        self.sentences.extend(sentences)
+        self.sentence_doc.extend([doc_idx] * len(sentences))
+        self.sentence_nums.extend(range(1, len(sentences) + 1))
+        self.sentence_pages.extend(pages or [1] * len(sentences))
+        self._pending.append(EmbeddingStore.from_embeddings(embeddings, self.dtype))
+        self._trained = False
+
+    def build(self):
+        """(Re)train the coarse quantizer and lay out vectors list by list"""
+        for part in self._pending:
+            self.store = part if self.store is None else self.store.concatenate(part)
+        self._pending = []
+
+        if self.store is None or len(self.store) == 0:
+            self._trained = True
+            return
+
+        if self.mode == "ivf":
+            n_lists = self.n_lists or max(1, int(np.sqrt(len(self.store))))
+            # Train on a sample; ~64 points per centroid is plenty
+            rng = np.random.default_rng(0)
+            sample_size = min(len(self.store), n_lists * 64)
+            sample_ids = np.sort(rng.choice(len(self.store), sample_size, replace=False))
+            self.centroids = spherical_kmeans(self.store.take(sample_ids).dequantize(), n_lists)
+
+            assignments = self._assign()
+            self._reorder(np.argsort(assignments, kind='stable'))
+            counts = np.bincount(assignments, minlength=len(self.centroids))
+            self.list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        self._trained = True
+
+    def search(self, query_embeddings, k=5):
+        """
+        Find the k nearest reference sentences for each query embedding
+
+        Returns:
+            scores: (n_queries, k) cosine similarities, best first (-inf = no result)
+            ids: (n_queries, k) row indices into the index (-1 = no result)
+        """
+        if not self._trained:
+            self.build()
+
+        queries = normalize_rows(query_embeddings)
+        n_queries = len(queries)
+        best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+        best_ids = np.full((n_queries, 0), -1, dtype=np.int64)
+
+        if len(self) and n_queries:
+            if self.mode == "exact":
+                best_scores, best_ids = self._search_exact(queries, k)
+            else:
+                best_scores, best_ids = self._search_ivf(queries, k)
+
+        # Pad to k columns and sort best first
+        if best_scores.shape[1] < k:
+            pad = k - best_scores.shape[1]
+            best_scores = np.pad(best_scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+            best_ids = np.pad(best_ids, ((0, 0), (0, pad)), constant_values=-1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+    def query(self, text, k=5, threshold=0.8):
+        """
+        Check a submission against the whole corpus
+
+        Returns:
+            plagiarism_percentage: share of submission sentences with at least one match
+            matches: list of dicts (same keys as check_plagiarism, plus document info)
+        """
+        segments = list(iter_sentences(text))
+        sentences = [segment.text for segment in segments]
+        if not sentences or not len(self):
+            return 0, []
+
+        scores, ids = self.search(self.detector.encode_batch(sentences), k)
+
+        matches = []
+        matched_sentences = 0
+        for i, sentence in enumerate(sentences):
+            hits = [(s, j) for s, j in zip(scores[i], ids[i]) if j >= 0 and s >= threshold]
+            if hits:
+                matched_sentences += 1
+            for score, j in hits:
+                matches.append({
+                    'original': sentence,
+                    'matched': self.sentences[j],
+                    'similarity': float(score),
+                    'sentence_num': i + 1,
+                    'page': segments[i].page,
+                    'document_id': self.document_ids[self.sentence_doc[j]],
+                    'matched_sentence_num': self.sentence_nums[j],
+                    'matched_page': self.sentence_pages[j],
+                })
+
+        plagiarism_pct = (matched_sentences / len(sentences)) * 100
+        return plagiarism_pct, matches
+
+    def recall(self, query_embeddings, k=5):
+        """Recall@k of the IVF search against exact search"""
+        approx_scores, approx_ids = self.search(query_embeddings, k)
+        exact_scores, exact_ids = self._search_exact(normalize_rows(query_embeddings), k)
+
+        found = 0
+        total = 0
+        for approx_row, exact_row in zip(approx_ids, exact_ids):
+            found += len(set(approx_row[approx_row >= 0]) & set(exact_row))
+            total += len(exact_row)
+        return found / total if total else 1.0
+
+    def save(self, directory):
+        """Write the index to a directory (vectors as .npy, metadata as JSON)"""
+        if not self._trained:
+            self.build()
+        os.makedirs(directory, exist_ok=True)
+
+        if self.store is not None:
+            self.store.save(directory)
+        if self.centroids is not None:
+            np.save(os.path.join(directory, "centroids.npy"), self.centroids)
+            np.save(os.path.join(directory, "list_offsets.npy"), self.list_offsets)
+
+        meta = {
+            'mode': self.mode,
+            'n_lists': self.n_lists,
+            'n_probe': self.n_probe,
+            'dtype': self.dtype,
+            'document_ids': self.document_ids,
+            'sentences': self.sentences,
+            'sentence_doc': self.sentence_doc,
+            'sentence_nums': self.sentence_nums,
+            'sentence_pages': self.sentence_pages,
+        }
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, detector, mmap=True):
+        """
+        Load an index written by save()
+
+        With mmap=True the vectors stay on disk and are paged in on demand,
+        shared between all processes that open the same index.
+        """
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        index = cls(detector, mode=meta['mode'], n_lists=meta['n_lists'],
+                    n_probe=meta['n_probe'], dtype=meta.get('dtype', "float32"))
+        index.document_ids = meta['document_ids']
+        index.sentences = meta['sentences']
+        index.sentence_doc = meta['sentence_doc']
+        index.sentence_nums = meta['sentence_nums']
+        index.sentence_pages = meta.get('sentence_pages', [1] * len(index.sentences))
+        if os.path.exists(os.path.join(directory, "vectors.npy")):
+            index.store = EmbeddingStore.open(directory, mmap=mmap)
+
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if os.path.exists(centroids_path):
+            index.centroids = np.load(centroids_path)
+            index.list_offsets = np.load(os.path.join(directory, "list_offsets.npy"))
+        index._trained = True
+        return index
+
+    def _assign(self, chunk_size=65536):
+        assignments = np.empty(len(self.store), dtype=np.int64)
+        for start in range(0, len(self.store), chunk_size):
+            end = min(start + chunk_size, len(self.store))
+            assignments[start:end] = np.argmax(self.store.scores(self.centroids, start, end), axis=0)
+        return assignments
+
+    def _reorder(self, permutation):
+        # Store vectors contiguously per list so each probe is one slice
+        self.store = self.store.take(permutation)
+        self.sentences = [self.sentences[i] for i in permutation]
+        self.sentence_doc = [self.sentence_doc[i] for i in permutation]
+        self.sentence_nums = [self.sentence_nums[i] for i in permutation]
+        self.sentence_pages = [self.sentence_pages[i] for i in permutation]
+
+    def _search_exact(self, queries, k):
+        if not self._trained:
+            self.build()
+        return self.store.search(queries, k)
+
+    def _search_ivf(self, queries, k):
+        n_probe = min(self.n_probe, len(self.centroids))
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, n_probe - 1, axis=1)[:, :n_probe]
+
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+
+        # Visit each list once and score every query probing it in one matmul
+        probe_lists = probes.ravel()
+        probe_queries = np.repeat(np.arange(len(queries)), n_probe)
+        order = np.argsort(probe_lists, kind='stable')
+        probe_lists = probe_lists[order]
+        probe_queries = probe_queries[order]
+        boundaries = np.flatnonzero(np.diff(probe_lists)) + 1
+
+        for query_group, list_group in zip(np.split(probe_queries, boundaries),
+                                           np.split(probe_lists, boundaries)):
+            list_id = list_group[0]
+            start, end = self.list_offsets[list_id], self.list_offsets[list_id + 1]
+            if start == end:
+                continue
+            scores = self.store.scores(queries[query_group], start, end)
+            ids = np.broadcast_to(np.arange(start, end), scores.shape)
+            merged_scores, merged_ids = merge_top_k(
+                best_scores[query_group], best_ids[query_group], scores, ids, k)
+            best_scores[query_group] = merged_scores
+            best_ids[query_group] = merged_ids
+
+        return best_scores, best_ids
@@ -0,0 +1,189 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_sentence(sentence):
+    """Normalize a sentence so trivially different copies share a cache entry"""
+    sentence = unicodedata.normalize('NFC', sentence)
+    return ' '.join(sentence.split())
+
+
+def make_key(model_name, sentence):
+    """Content-addressed key: model name + hash of the normalized sentence"""
+    digest = hashlib.sha256(normalize_sentence(sentence).encode('utf-8')).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    Two-tier sentence embedding cache
+
+    - Memory tier: LRU dictionary holding the most recently used vectors
+    - Disk tier: optional SQLite file that survives restarts
+
+    Both tiers are size-bounded and evict least recently used entries.
+
+    Args:
+        path: SQLite file for the persistent tier (None = memory only)
+        max_memory_items: maximum vectors kept in the in-memory LRU
+        max_disk_items: maximum vectors kept in the SQLite file
+    """
+
+    def __init__(self, path=None, max_memory_items=10000, max_disk_items=1000000):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys):
+        """
+        Look up several keys at once
+
+        Returns:
+            dict mapping each found key to its embedding (missing keys are omitted)
+        """
+        found = {}
+        pending = []
+
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.hits += 1
+                else:
+                    pending.append(key)
+
+            if pending and self._db is not None:
+                now = time.time()
+                for chunk_start in range(0, len(pending), 500):
+                    chunk = pending[chunk_start:chunk_start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = self._db.execute(
+                        f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                    for key, dim, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32, count=dim)
+                        found[key] = vector
+                        self._remember(key, vector)
+                    if rows:
+                        self._db.executemany(
+                            "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                            [(now, row[0]) for row in rows],
+                        )
+                self._db.commit()
+                self.disk_hits += sum(1 for key in pending if key in found)
+                self.hits += sum(1 for key in pending if key in found)
+
+            self.misses += sum(1 for key in pending if key not in found)
+
+        return found
+
+    def put_many(self, items):
+        """Store (key, embedding) pairs in both tiers"""
+        items = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in items]
+        if not items:
+            return
+
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+
+            if self._db is not None:
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, vector.shape[0], vector.tobytes(), now) for key, vector in items],
+                )
+                # Upper bound (replaced keys are counted twice); recounted on eviction
+                self._disk_count += len(items)
+                if self._disk_count > self.max_disk_items:
+                    self._evict_disk()
+                self._db.commit()
+
+    def get(self, key):
+        """Look up a single key, returns None on a miss"""
+        return self.get_many([key]).get(key)
+
+    def put(self, key, embedding):
+        """Store a single embedding"""
+        self.put_many([(key, embedding)])
+
+    def stats(self):
+        """Hit/miss counters and current tier sizes"""
+        with self._lock:
+            disk_items = 0
+            if self._db is not None:
+                disk_items = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self._disk_count = disk_items
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'memory_items': len(self._memory),
+                'disk_items': disk_items,
+            }
+
+    def close(self):
+        """Close the SQLite connection"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key, vector):
+        # Caller holds the lock
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        # Caller holds the lock
+        count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_disk_items:
+            self._disk_count = count
+            return
+        # Evict down to 90% so the next few inserts don't trigger another recount
+        excess = count - int(self.max_disk_items * 0.9)
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            count -= excess
+        self._disk_count = count
@@ -0,0 +1,234 @@
+import os
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+
+def normalize_rows(vectors):
+    """L2-normalize rows so dot products are cosine similarities"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def merge_top_k(best_scores, best_ids, scores, ids, k):
+    """Merge new candidate scores into running top-k arrays (row-wise)"""
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    all_ids = np.concatenate([best_ids, ids], axis=1)
+    if all_scores.shape[1] > k:
+        keep = np.argpartition(-all_scores, k - 1, axis=1)[:, :k]
+        all_scores = np.take_along_axis(all_scores, keep, axis=1)
+        all_ids = np.take_along_axis(all_ids, keep, axis=1)
+    return all_scores, all_ids
+
+
+def quantize(embeddings, dtype="float16"):
+    """
+    L2-normalize embeddings and convert them to a compact storage type
+
+    - float32: 4 bytes per dimension (reference)
+    - float16: 2 bytes per dimension
+    - int8: 1 byte per dimension plus one float32 scale per vector
+      (symmetric, per-vector: value = int8 * scale)
+
+    Returns:
+        vectors: array of the requested dtype
+        scales: float32 per-vector scales for int8, otherwise None
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported storage dtype: {dtype}")
+
+    vectors = normalize_rows(embeddings)
+    if dtype == "float32":
+        return vectors, None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+class EmbeddingStore:
+    """
+    Pre-normalized sentence embeddings, optionally quantized and memory-mapped
+
+    Stored on disk as plain .npy files (vectors.npy, plus scales.npy for
+    int8). open() memory-maps them read-only, so loading is instant and
+    every worker process shares the same pages through the OS page cache.
+    Similarity is computed block by block directly from the stored type;
+    the full float32 matrix is never materialized.
+
+    Args:
+        vectors: (n, dim) array of float32, float16 or int8
+        scales: per-vector float32 scales (int8 only)
+    """
+
+    def __init__(self, vectors, scales=None):
+        if vectors.dtype == np.int8 and scales is None:
+            raise ValueError("int8 vectors need per-vector scales")
+        self.vectors = vectors
+        self.scales = scales
+
+    @classmethod
+    def from_embeddings(cls, embeddings, dtype="float32"):
+        """Normalize and quantize raw embeddings into an in-memory store"""
+        vectors, scales = quantize(embeddings, dtype)
+        return cls(vectors, scales)
+
+    @classmethod
+    def open(cls, directory, mmap=True):
+        """Open a store written by save(), memory-mapped by default"""
+        mmap_mode = "r" if mmap else None
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mmap_mode)
+        scales = None
+        scales_path = os.path.join(directory, "scales.npy")
+        if os.path.exists(scales_path):
+            scales = np.load(scales_path, mmap_mode=mmap_mode)
+        return cls(vectors, scales)
+
+    def save(self, directory):
+        """Write vectors (and scales) as .npy files"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "vectors.npy"), self.vectors)
+        scales_path = os.path.join(directory, "scales.npy")
+        if self.scales is not None:
+            np.save(scales_path, self.scales)
+        elif os.path.exists(scales_path):
+            os.remove(scales_path)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def dtype(self):
+        return self.vectors.dtype.name
+
+    @property
+    def nbytes(self):
+        scale_bytes = self.scales.nbytes if self.scales is not None else 0
+        return self.vectors.nbytes + scale_bytes
+
+    def take(self, indices):
+        """New in-memory store with the given rows (in that order)"""
+        scales = self.scales[indices] if self.scales is not None else None
+        return EmbeddingStore(np.asarray(self.vectors[indices]), scales)
+
+    def concatenate(self, other):
+        """New in-memory store with other's rows appended"""
+        if other.dtype != self.dtype:
+            raise ValueError(f"Cannot append {other.dtype} vectors to a {self.dtype} store")
+        vectors = np.concatenate([self.vectors, other.vectors])
+        scales = None
+        if self.scales is not None:
+            scales = np.concatenate([self.scales, other.scales])
+        return EmbeddingStore(vectors, scales)
+
+    def dequantize(self, start=0, end=None):
+        """Rows [start, end) as float32"""
+        block = np.asarray(self.vectors[start:end], dtype=np.float32)
+        if self.scales is not None:
+            block = block * self.scales[start:end, None]
+        return block
+
+    def scores(self, queries, start=0, end=None):
+        """
+        Cosine similarities between normalized queries and rows [start, end)
+
+        Args:
+            queries: L2-normalized float32 array (n_queries, dim)
+
+        Returns:
+            float32 array (n_queries, end - start)
+        """
+        block = self.vectors[start:end]
+        if block.dtype != np.float32:
+            block = block.astype(np.float32)
+        scores = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales[start:end]
+        return scores
+
+    def search(self, queries, k=10, block_size=65536):
+        """
+        Exact top-k search over the whole store
+
+        Returns:
+            scores, ids: (n_queries, <=k) arrays, unsorted
+        """
+        queries = normalize_rows(queries)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), 0), -1, dtype=np.int64)
+        for start in range(0, len(self), block_size):
+            end = min(start + block_size, len(self))
+            scores = self.scores(queries, start, end)
+            ids = np.broadcast_to(np.arange(start, end), scores.shape)
+            best_scores, best_ids = merge_top_k(best_scores, best_ids, scores, ids, k)
+        return best_scores, best_ids
+
+
+def benchmark_quantization(embeddings, queries, threshold=0.8, k=10):
+    """
+    Measure accuracy loss of float16/int8 storage against float32
+
+    For each storage type reports:
+    - recall_at_k: overlap of the top-k neighbours with float32 top-k
+    - best_match_agreement: share of queries whose best match is unchanged
+    - threshold_agreement: share of queries whose "best score >= threshold"
+      decision (the plagiarism flag) is unchanged
+    - max_score_error: largest absolute error of the best score
+    - bytes_per_vector
+
+    Returns:
+        dict mapping dtype name to its metrics
+    """
+    reference = EmbeddingStore.from_embeddings(embeddings, "float32")
+    ref_scores, ref_ids = reference.search(queries, k)
+    ref_best = ref_scores.max(axis=1)
+    ref_best_ids = ref_ids[np.arange(len(ref_ids)), ref_scores.argmax(axis=1)]
+
+    results = {}
+    for dtype in DTYPES:
+        store = reference if dtype == "float32" else EmbeddingStore.from_embeddings(embeddings, dtype)
+        scores, ids = store.search(queries, k)
+        best = scores.max(axis=1)
+        best_ids = ids[np.arange(len(ids)), scores.argmax(axis=1)]
+
+        overlap = sum(len(set(a) & set(b)) for a, b in zip(ids, ref_ids))
+        results[dtype] = {
+            'recall_at_k': overlap / ref_ids.size if ref_ids.size else 1.0,
+            'best_match_agreement': float(np.mean(best_ids == ref_best_ids)),
+            'threshold_agreement': float(np.mean((best >= threshold) == (ref_best >= threshold))),
+            'max_score_error': float(np.max(np.abs(best - ref_best))),
+            'bytes_per_vector': store.nbytes / len(store),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Quantization accuracy benchmark")
+    parser.add_argument("embeddings", help="float32 .npy file of sentence embeddings "
+                                           "(e.g. embeddings.npy from a saved CorpusIndex)")
+    parser.add_argument("--queries", type=int, default=1000,
+                        help="number of rows held out as queries")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    data = np.load(args.embeddings).astype(np.float32)
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(data))
+    n_queries = min(args.queries, len(data) // 2)
+    query_vectors = data[order[:n_queries]]
+    corpus_vectors = data[order[n_queries:]]
+
+    print(f"Corpus: {len(corpus_vectors)} vectors, queries: {n_queries}, "
+          f"threshold: {args.threshold}, k: {args.k}")
+    report = benchmark_quantization(corpus_vectors, query_vectors, args.threshold, args.k)
+    for name, metrics in report.items():
+        print(f"{name:8s} " + "  ".join(f"{key}={value:.4f}" for key, value in metrics.items()))
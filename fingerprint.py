@@ -0,0 +1,172 @@
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from embedding_cache import normalize_sentence
+
+# Mersenne prime 2^31 - 1: a * h + b stays below 2^63 for 32-bit shingle hashes
+_PRIME = (1 << 31) - 1
+
+
+def shingles(sentence, mode="char", n=5):
+    """
+    Hashed n-gram shingles of a case-folded, whitespace-normalized sentence
+
+    Args:
+        mode: "char" (character n-grams) or "word" (word n-grams)
+        n: n-gram size
+
+    Returns:
+        set of 32-bit shingle hashes
+    """
+    text = normalize_sentence(sentence).casefold()
+    if mode == "word":
+        tokens = text.split()
+        grams = [' '.join(tokens[i:i + n]) for i in range(max(1, len(tokens) - n + 1))]
+    else:
+        grams = [text[i:i + n] for i in range(max(1, len(text) - n + 1))]
+    return {zlib.crc32(gram.encode('utf-8')) for gram in grams}
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class LexicalFingerprinter:
+    """
+    Shingling + MinHash + LSH banding for (near-)verbatim copy detection
+
+    MinHash signatures estimate the Jaccard similarity of shingle sets; LSH
+    splits each signature into bands and only pairs sharing at least one
+    band bucket become candidates, so no all-pairs comparison is needed.
+    With the defaults (16 bands x 4 rows) pairs above ~0.5 Jaccard are
+    almost always candidates and pairs below ~0.2 almost never are.
+
+    Args:
+        mode: "char" or "word" shingles
+        n: shingle size
+        num_perm: MinHash signature length
+        bands: number of LSH bands (num_perm must be divisible by it)
+        seed: random seed for the hash permutations
+    """
+
+    def __init__(self, mode="char", n=5, num_perm=64, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.mode = mode
+        self.n = n
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def shingle_sets(self, sentences):
+        return [shingles(s, self.mode, self.n) for s in sentences]
+
+    def signatures(self, shingle_sets, chunk_shingles=65536):
+        """MinHash signatures, one row per shingle set (vectorized over all sets)"""
+        signatures = np.full((len(shingle_sets), self.num_perm), _PRIME, dtype=np.uint64)
+        non_empty = [i for i, s in enumerate(shingle_sets) if s]
+
+        # Process sets in chunks to bound the (num_perm x shingles) temporary
+        start = 0
+        while start < len(non_empty):
+            end, total = start, 0
+            while end < len(non_empty) and (end == start or total < chunk_shingles):
+                total += len(shingle_sets[non_empty[end]])
+                end += 1
+            chunk = non_empty[start:end]
+
+            hashes = np.fromiter((h for i in chunk for h in shingle_sets[i]), dtype=np.uint64)
+            sizes = np.array([len(shingle_sets[i]) for i in chunk])
+            offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+            signatures[chunk] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            start = end
+
+        return signatures
+
+    def band_keys(self, signatures):
+        """One hashable key per (row, band)"""
+        banded = signatures.reshape(len(signatures), self.bands, self.rows)
+        return [[(band, banded[i, band].tobytes()) for band in range(self.bands)]
+                for i in range(len(signatures))]
+
+    def match_sentences(self, sentences1, sentences2, threshold=0.9):
+        """
+        Find near-verbatim copies of sentences1 in sentences2
+
+        Candidates come from LSH buckets and are confirmed with the exact
+        Jaccard similarity of their shingle sets.
+
+        Returns:
+            dict mapping index in sentences1 to (index in sentences2, jaccard)
+            for every sentence whose best lexical match reaches threshold
+        """
+        return self.match_reference(sentences1, self.index_reference(sentences2), threshold)
+
+    def index_reference(self, sentences):
+        """Shingle sets and LSH buckets of reference sentences, reusable across match_reference calls"""
+        sets = self.shingle_sets(sentences)
+        buckets = defaultdict(list)
+        for j, keys in enumerate(self.band_keys(self.signatures(sets))):
+            for key in keys:
+                buckets[key].append(j)
+        return sets, buckets
+
+    def match_reference(self, sentences, reference, threshold=0.9):
+        """match_sentences against a reference prepared by index_reference"""
+        sets2, buckets = reference
+        sets1 = self.shingle_sets(sentences)
+
+        matches = {}
+        for i, keys in enumerate(self.band_keys(self.signatures(sets1))):
+            candidates = {j for key in keys for j in buckets.get(key, ())}
+            best = None
+            for j in candidates:
+                score = jaccard(sets1[i], sets2[j])
+                if score >= threshold and (best is None or score > best[1]):
+                    best = (j, score)
+            if best is not None:
+                matches[i] = best
+        return matches
+
+
+class LexicalIndex:
+    """
+    LSH index over the sentences of many documents
+
+    Used to prune document pairs before semantic comparison: a pair is
+    plausible only if some sentence of one document lands in the same LSH
+    bucket as a sentence of the other. Note that translated (cross-language)
+    copies share no shingles and are pruned as well.
+    """
+
+    def __init__(self, fingerprinter=None):
+        self.fingerprinter = fingerprinter or LexicalFingerprinter()
+        self._buckets = defaultdict(set)
+
+    def add_document(self, document_id, sentences):
+        signatures = self.fingerprinter.signatures(self.fingerprinter.shingle_sets(sentences))
+        for keys in self.fingerprinter.band_keys(signatures):
+            for key in keys:
+                self._buckets[key].add(document_id)
+
+    def candidate_documents(self, sentences, min_shared_sentences=1):
+        """Documents sharing an LSH bucket with at least min_shared_sentences of the given sentences"""
+        signatures = self.fingerprinter.signatures(self.fingerprinter.shingle_sets(sentences))
+        counts = defaultdict(int)
+        for keys in self.fingerprinter.band_keys(signatures):
+            hits = set()
+            for key in keys:
+                hits |= self._buckets.get(key, set())
+            for document_id in hits:
+                counts[document_id] += 1
+        return {doc for doc, count in counts.items() if count >= min_shared_sentences}
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+# Largest allowed |cosine(backend) - cosine(fp32 torch)| on the bundled examples
+DEFAULT_TOLERANCES = {
+    "torch": 1e-5,
+    "onnx": 1e-3,
+    "torch-int8": 0.03,
+}
+
+
+def load_backend(model, backend="torch", num_threads=None, onnx_path=None):
+    """
+    Build the forward function used by MultilingualPlagiarismDetector
+
+    Backends:
+    - "torch": eager fp32 PyTorch (reference)
+    - "torch-int8": dynamic int8 quantization of every nn.Linear layer
+      (weights stored as int8, activations quantized on the fly)
+    - "onnx": model exported once to ONNX and run with onnxruntime at the
+      highest graph optimization level (requires the onnxruntime package)
+
+    Args:
+        model: loaded Hugging Face model in eval mode
+        backend: one of BACKENDS
+        num_threads: intra-op threads (None = library default)
+        onnx_path: where to export/reuse the ONNX graph (onnx backend only)
+
+    Returns:
+        forward(inputs) -> last_hidden_state tensor, where inputs is the
+        tokenizer output (dict of int64 tensors)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend} (choose from {', '.join(BACKENDS)})")
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    if backend == "onnx":
+        return _load_onnx(model, num_threads, onnx_path)
+
+    if backend == "torch-int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def forward(inputs):
+        with torch.no_grad():
+            return model(**inputs).last_hidden_state
+
+    return forward
+
+
+def _load_onnx(model, num_threads, onnx_path):
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise ImportError("The onnx backend needs onnxruntime: pip install onnxruntime") from e
+
+    if onnx_path is None:
+        cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "plagiarism_detector")
+        name = model.config.name_or_path.replace("/", "__") or "model"
+        onnx_path = os.path.join(cache_dir, f"{name}-{_model_fingerprint(model)}.onnx")
+
+    if not os.path.exists(onnx_path):
+        export_onnx(model, onnx_path)
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+    input_names = {node.name for node in session.get_inputs()}
+
+    def forward(inputs):
+        feed = {name: tensor.numpy().astype(np.int64)
+                for name, tensor in inputs.items() if name in input_names}
+        last_hidden_state = session.run(["last_hidden_state"], feed)[0]
+        return torch.from_numpy(last_hidden_state)
+
+    return forward
+
+
+def _model_fingerprint(model):
+    """
+    Short hash of what the exported graph depends on
+
+    Covers the resolved config (architecture, layer count, sizes), the Hub
+    commit and, for local snapshots, the pinned revision, so a new revision
+    or a truncated variant of the same model never reuses a stale export.
+    """
+    config = model.config
+    revision = getattr(config, '_commit_hash', None)
+    manifest = os.path.join(config.name_or_path, "snapshot.json")
+    if os.path.isfile(manifest):
+        with open(manifest, encoding='utf-8') as f:
+            revision = json.load(f).get('revision', revision)
+    key = json.dumps({
+        'config': config.to_dict(),
+        'revision': revision,
+        'num_hidden_layers': getattr(config, 'num_hidden_layers', None),
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def export_onnx(model, onnx_path):
+    """Export the model to ONNX with dynamic batch and sequence axes"""
+    logger.info("Exporting model to ONNX: %s", onnx_path)
+    os.makedirs(os.path.dirname(os.path.abspath(onnx_path)), exist_ok=True)
+
+    dummy = {
+        'input_ids': torch.ones((1, 8), dtype=torch.long),
+        'attention_mask': torch.ones((1, 8), dtype=torch.long),
+    }
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in dummy}
+    dynamic_axes['last_hidden_state'] = {0: "batch", 1: "sequence"}
+
+    # Write to a temporary name so a crashed export never leaves a broken file
+    tmp_path = onnx_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy['input_ids'], dummy['attention_mask']),
+            tmp_path,
+            input_names=list(dummy),
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    os.replace(tmp_path, onnx_path)
+    return onnx_path
+
+
+def verify_backend_accuracy(backends=("torch-int8", "onnx"), tolerances=None, num_threads=None):
+    """
+    Compare similarity scores of each backend against the fp32 torch model
+
+    Every sentence pair of the bundled English and Tamil examples is scored
+    with both models; a backend passes if no cosine similarity moves by
+    more than its tolerance.
+
+    Returns:
+        dict mapping backend name to {'max_abs_error', 'tolerance', 'passed'}
+    """
+    from plagiarism_checker_multilingual import EXAMPLE_DOCUMENTS, MultilingualPlagiarismDetector
+
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    reference = MultilingualPlagiarismDetector(backend="torch", num_threads=num_threads)
+
+    def similarity_matrices(detector):
+        matrices = []
+        for doc1, doc2 in EXAMPLE_DOCUMENTS.values():
+            emb1 = detector.encode_batch(detector.split_into_sentences(doc1))
+            emb2 = detector.encode_batch(detector.split_into_sentences(doc2))
+            emb1 /= np.linalg.norm(emb1, axis=1, keepdims=True)
+            emb2 /= np.linalg.norm(emb2, axis=1, keepdims=True)
+            matrices.append(emb1 @ emb2.T)
+        return matrices
+
+    expected = similarity_matrices(reference)
+
+    results = {}
+    for backend in backends:
+        detector = MultilingualPlagiarismDetector(backend=backend, num_threads=num_threads)
+        actual = similarity_matrices(detector)
+        error = max(float(np.max(np.abs(a - e))) for a, e in zip(actual, expected))
+        results[backend] = {
+            'max_abs_error': error,
+            'tolerance': tolerances[backend],
+            'passed': error <= tolerances[backend],
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Check backend similarity scores against fp32")
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx"], choices=BACKENDS)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    report = verify_backend_accuracy(args.backends, num_threads=args.threads)
+    for name, result in report.items():
+        status = "✅ PASS" if result['passed'] else "❌ FAIL"
+        print(f"{status} {name}: max |Δcosine| = {result['max_abs_error']:.5f} "
+              f"(tolerance {result['tolerance']})")
+    sys.exit(0 if all(r['passed'] for r in report.values()) else 1)
@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+FINISHED_STATES = (DONE, FAILED)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = os.path.join(os.path.expanduser("~"), ".cache", "plagiarism_detector", "jobs")
+
+
+class JobQueueFull(Exception):
+    """Raised by JobEngine.submit when the pending queue is at capacity"""
+
+
+class JobStore:
+    """
+    SQLite-backed job records
+
+    Keeps status, progress, parameters and results so jobs survive
+    restarts. Jobs that were queued or running when the process stopped
+    are marked failed when the store is opened again (unless recover is
+    False, e.g. in worker processes sharing the store with live siblings).
+    """
+
+    def __init__(self, path, recover=True):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " progress REAL NOT NULL,"
+                " stage TEXT,"
+                " params TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " created REAL NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+            if recover:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE status IN (?, ?)",
+                    (FAILED, "Interrupted by a server restart", time.time(), QUEUED, RUNNING),
+                )
+            self._db.commit()
+
+    def create(self, job_id, params):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, progress, stage, params, created, updated)"
+                " VALUES (?, ?, 0, NULL, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(params), now, now),
+            )
+            self._db.commit()
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'], ensure_ascii=False)
+        fields['updated'] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, progress, stage, params, result, error, created, updated"
+                " FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'status': row[1],
+            'progress': row[2],
+            'stage': row[3],
+            'params': json.loads(row[4]),
+            'result': json.loads(row[5]) if row[5] is not None else None,
+            'error': row[6],
+            'created': row[7],
+            'updated': row[8],
+        }
+
+
+class JobEngine:
+    """
+    Bounded pool of background workers running comparison jobs
+
+    submit() returns a job id immediately; at most max_pending jobs may
+    wait in the queue, after which JobQueueFull is raised (backpressure).
+    Progress is kept in memory for fast polling and written to the store
+    at most every few percent. Partial results (e.g. matches found so far)
+    are only kept in memory while the job runs; see partial().
+
+    Args:
+        run_fn: function(params, progress) -> JSON-serializable result, where
+            progress(fraction, stage, partial=None) reports real completion and
+            optionally a list of new partial results
+        store: JobStore
+        workers: number of worker threads
+        max_pending: maximum number of queued (not yet running) jobs
+    """
+
+    def __init__(self, run_fn, store, workers=4, max_pending=100):
+        self.run_fn = run_fn
+        self.store = store
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._live = {}
+        self._condition = threading.Condition()
+
+        self._workers = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, params):
+        """Queue a job and return its id (raises JobQueueFull when saturated)"""
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, params)
+        with self._condition:
+            self._live[job_id] = {'status': QUEUED, 'progress': 0.0, 'stage': None, 'partial': []}
+        try:
+            self._queue.put_nowait((job_id, params))
+        except queue.Full:
+            self._finish(job_id, status=FAILED, error="Job queue is full")
+            raise JobQueueFull(f"{self._queue.maxsize} jobs already waiting")
+        return job_id
+
+    def get(self, job_id):
+        """Current job record (live progress overrides the stored one)"""
+        job = self.store.get(job_id)
+        if job is not None:
+            with self._condition:
+                live = self._live.get(job_id)
+                if live is not None:
+                    job.update(status=live['status'], progress=live['progress'], stage=live['stage'])
+        return job
+
+    def partial(self, job_id, start=0):
+        """Partial results reported so far, from index start (None once the job finished)"""
+        with self._condition:
+            live = self._live.get(job_id)
+            return None if live is None else live['partial'][start:]
+
+    def wait(self, job_id, last_progress=None, timeout=1.0, poll_interval=0.25):
+        """Block until the job's progress changes, it finishes, or timeout expires"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                live = self._live.get(job_id)
+                if live is None or live['progress'] != last_progress:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+        # Jobs run by another process sharing the store: poll the persisted record
+        job = self.get(job_id)
+        while (live is None and job is not None and job['status'] not in FINISHED_STATES
+               and job['progress'] == last_progress and time.monotonic() < deadline):
+            time.sleep(min(poll_interval, max(0.0, deadline - time.monotonic())))
+            job = self.get(job_id)
+        return job
+
+    def _work(self):
+        while True:
+            job_id, params = self._queue.get()
+            try:
+                self._run(job_id, params)
+            except Exception:
+                # Never let one job take the worker down with it
+                logger.exception("Job %s could not be finished", job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id, params):
+        try:
+            self._set_progress(job_id, 0.0, None, status=RUNNING)
+            self.store.update(job_id, status=RUNNING)
+            result = self.run_fn(params, lambda fraction, stage, partial=None:
+                                 self._set_progress(job_id, fraction, stage, partial=partial))
+            # Storing the result (JSON encoding included) can fail too; that fails the job
+            self._finish(job_id, status=DONE, progress=1.0, result=result)
+        except Exception as e:
+            self._finish(job_id, status=FAILED, error=f"{type(e).__name__}: {e}")
+
+    def _set_progress(self, job_id, fraction, stage, status=None, partial=None):
+        with self._condition:
+            live = self._live[job_id]
+            if partial:
+                live['partial'].extend(partial)
+            persist = fraction - live.get('persisted', 0.0) >= 0.05 or stage != live['stage']
+            live.update(progress=fraction, stage=stage)
+            if status:
+                live['status'] = status
+            if persist:
+                live['persisted'] = fraction
+            self._condition.notify_all()
+        if persist:
+            self.store.update(job_id, progress=fraction, stage=stage)
+
+    def _finish(self, job_id, **fields):
+        try:
+            self.store.update(job_id, **fields)
+        finally:
+            with self._condition:
+                self._live.pop(job_id, None)
+                self._condition.notify_all()
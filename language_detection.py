@@ -0,0 +1,79 @@
+"""
+Cheap script/language detection for routing sentences between models
+
+Looks only at Unicode code point ranges (plus a handful of English function
+words for Latin text), so it costs microseconds per sentence and needs no
+model or dictionary. Good enough to tell same-language sentence pairs from
+cross-language ones; it does not tell apart languages sharing a script
+other than English.
+"""
+from bisect import bisect_right
+
+# (first code point, last code point, script), sorted by first code point
+SCRIPT_RANGES = (
+    (0x0041, 0x005A, 'latin'), (0x0061, 0x007A, 'latin'), (0x00C0, 0x024F, 'latin'),
+    (0x0370, 0x03FF, 'greek'), (0x0400, 0x052F, 'cyrillic'), (0x0530, 0x058F, 'armenian'),
+    (0x0590, 0x05FF, 'hebrew'), (0x0600, 0x06FF, 'arabic'), (0x0750, 0x077F, 'arabic'),
+    (0x0900, 0x097F, 'devanagari'), (0x0980, 0x09FF, 'bengali'), (0x0A00, 0x0A7F, 'gurmukhi'),
+    (0x0A80, 0x0AFF, 'gujarati'), (0x0B00, 0x0B7F, 'oriya'), (0x0B80, 0x0BFF, 'tamil'),
+    (0x0C00, 0x0C7F, 'telugu'), (0x0C80, 0x0CFF, 'kannada'), (0x0D00, 0x0D7F, 'malayalam'),
+    (0x0D80, 0x0DFF, 'sinhala'), (0x0E00, 0x0E7F, 'thai'), (0x0E80, 0x0EFF, 'lao'),
+    (0x1000, 0x109F, 'myanmar'), (0x10A0, 0x10FF, 'georgian'), (0x1100, 0x11FF, 'hangul'),
+    (0x1200, 0x137F, 'ethiopic'), (0x1780, 0x17FF, 'khmer'), (0x1E00, 0x1EFF, 'latin'),
+    (0x3040, 0x30FF, 'kana'), (0x3130, 0x318F, 'hangul'), (0x3400, 0x4DBF, 'han'),
+    (0x4E00, 0x9FFF, 'han'), (0xAC00, 0xD7AF, 'hangul'), (0xFB50, 0xFDFF, 'arabic'),
+    (0xFE70, 0xFEFF, 'arabic'),
+)
+_STARTS = [start for start, _, _ in SCRIPT_RANGES]
+
+# Frequent English function words; Latin-script sentences with enough of them count as English
+ENGLISH_WORDS = frozenset(
+    "the of and to in is that for it as was with be by on not he this are or his from at "
+    "which but have an they you were their one all we can has been there its would more "
+    "will if so what about into than them these may only other some such".split()
+)
+
+# Letters inspected per sentence; the dominant script is clear long before the end
+MAX_LETTERS = 64
+
+
+def detect_script(text):
+    """
+    Dominant script of text ('latin', 'tamil', 'devanagari', 'han', ...)
+
+    Japanese (any kana) is reported as 'kana' even when most characters are
+    han. Returns '' when text has no letters of a known script.
+    """
+    counts = {}
+    letters = 0
+    for char in text:
+        code = ord(char)
+        index = bisect_right(_STARTS, code) - 1
+        if index < 0 or code > SCRIPT_RANGES[index][1]:
+            continue
+        script = SCRIPT_RANGES[index][2]
+        counts[script] = counts.get(script, 0) + 1
+        letters += 1
+        if letters >= MAX_LETTERS:
+            break
+    if not counts:
+        return ''
+    if 'kana' in counts:
+        return 'kana'
+    return max(counts, key=counts.get)
+
+
+def detect_language(text, min_english_share=0.15):
+    """
+    Routing key of a sentence: 'en' for English, otherwise its script
+
+    Latin-script text counts as English when at least min_english_share of
+    its words are common English function words.
+    """
+    script = detect_script(text)
+    if script != 'latin':
+        return script
+    words = text.lower().split()
+    if words and sum(word.strip('.,;:!?()"\'') in ENGLISH_WORDS for word in words) >= min_english_share * len(words):
+        return 'en'
+    return 'latin'
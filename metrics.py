@@ -0,0 +1,343 @@
+"""
+Pipeline instrumentation: stage timers, counters, hooks and traces
+
+Instrumented code calls the shared `metrics` registry:
+
+    with metrics.timer('forward'):
+        ...
+    metrics.inc('embedding_cache_lookups', hits, result='hit')
+
+Nothing is recorded unless the registry is enabled (metrics.enable()) or a
+per-request trace is active (with start_trace() as trace: ...); otherwise
+timer() returns a shared no-op context and inc()/observe() return at once.
+Use `metrics.active` to skip computing values that only feed metrics.
+
+Processes serving one endpoint (pre-forked workers) each keep their own
+registry; metrics.start_publishing(directory) writes it there periodically
+and render_directory(directory) serves the sum of every process.
+"""
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+PREFIX = "plagiarism_"
+
+# Histogram buckets for stage latencies (seconds) and batch sizes (sentences)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_current_trace = contextvars.ContextVar('plagiarism_trace', default=None)
+
+
+class Trace:
+    """Stage spans and counters recorded for one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(float)
+
+    def add_span(self, stage, start, seconds, labels):
+        self.spans.append({'stage': stage, 'offset': start - self.start, 'seconds': seconds, **labels})
+
+    def add_count(self, series, amount):
+        self.counters[series] += amount
+
+    def to_dict(self):
+        """JSON-serializable trace (span offsets and durations in seconds)"""
+        return {
+            'spans': [dict(span) for span in self.spans],
+            'counters': dict(self.counters),
+        }
+
+
+@contextmanager
+def start_trace():
+    """Record every instrumented stage run by this thread/context into a new Trace"""
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+class _SharedTrace:
+    """Records into several traces at once (work done on behalf of several requests)"""
+
+    def __init__(self, traces):
+        self.traces = traces
+
+    def add_span(self, stage, start, seconds, labels):
+        for trace in self.traces:
+            trace.add_span(stage, start, seconds, labels)
+
+    def add_count(self, series, amount):
+        for trace in self.traces:
+            trace.add_count(series, amount)
+
+
+@contextmanager
+def share_trace(traces):
+    """
+    Record every instrumented stage run by this thread/context into each of traces
+
+    For work one thread does for several requests at once, like a batch
+    of sentences from several callers: every request's trace gets the
+    spans and counters of the whole shared work. None entries are ignored.
+    """
+    traces = list({id(trace): trace for trace in traces if trace is not None}.values())
+    token = _current_trace.set(_SharedTrace(traces) if traces else None)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('registry', 'stage', 'labels', 'trace', 'start')
+
+    def __init__(self, registry, stage, labels, trace):
+        self.registry = registry
+        self.stage = stage
+        self.labels = labels
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        seconds = end - self.start
+        if self.registry.enabled:
+            self.registry.observe('stage_seconds', seconds, stage=self.stage, **self.labels)
+        if self.trace is not None:
+            self.trace.add_span(self.stage, self.start, seconds, self.labels)
+        return False
+
+
+class Metrics:
+    """
+    Thread-safe counters and histograms with Prometheus text exposition
+
+    Args:
+        enabled: record observations (traces are recorded either way)
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(float))
+        self._histograms = defaultdict(dict)
+        self._buckets = {PREFIX + 'stage_seconds': LATENCY_BUCKETS}
+        self._hooks = []
+        # Serializes publish(), so an older state never replaces a newer one
+        self._publish_lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    @property
+    def active(self):
+        """Whether anything would be recorded (registry enabled or a trace running)"""
+        return self.enabled or _current_trace.get() is not None
+
+    def add_hook(self, hook):
+        """
+        Forward every observation to hook(kind, name, value, labels)
+
+        kind is 'counter' or 'histogram'; name carries the metric prefix.
+        Hooks run synchronously on the instrumented thread, so keep them cheap.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def timer(self, stage, **labels):
+        """Context manager timing one run of a pipeline stage"""
+        trace = _current_trace.get()
+        if not self.enabled and trace is None:
+            return _NULL_TIMER
+        return _Timer(self, stage, labels, trace)
+
+    def inc(self, name, amount=1, **labels):
+        """Add amount to the counter <prefix><name>_total"""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_count(_series_name(name, labels), amount)
+        if not self.enabled:
+            return
+        name = f"{PREFIX}{name}_total"
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._counters[name][key] += amount
+        for hook in self._hooks:
+            hook('counter', name, amount, labels)
+
+    def observe(self, name, value, buckets=None, **labels):
+        """Record value in the histogram <prefix><name>"""
+        if not self.enabled:
+            return
+        name = PREFIX + name
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            bounds = self._buckets.setdefault(name, buckets or LATENCY_BUCKETS)
+            series = self._histograms[name].get(key)
+            if series is None:
+                series = self._histograms[name][key] = [[0] * len(bounds), 0.0, 0]
+            index = bisect.bisect_left(bounds, value)
+            if index < len(bounds):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+        for hook in self._hooks:
+            hook('histogram', name, value, labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Counter values and histogram (sum, count) pairs keyed by series name"""
+        with self._lock:
+            counters = {_series_name(name, dict(key)): value
+                        for name, series in self._counters.items() for key, value in series.items()}
+            histograms = {_series_name(name, dict(key)): (data[1], data[2])
+                          for name, series in self._histograms.items() for key, data in series.items()}
+        return {'counters': counters, 'histograms': histograms}
+
+    def export_state(self):
+        """Every counter and histogram series as JSON-serializable data (see merge_state)"""
+        with self._lock:
+            return {
+                'counters': {name: [[list(key), value] for key, value in series.items()]
+                             for name, series in self._counters.items()},
+                'histograms': {name: {'buckets': list(self._buckets[name]),
+                                      'series': [[list(key), list(data[0]), data[1], data[2]]
+                                                 for key, data in series.items()]}
+                               for name, series in self._histograms.items()},
+            }
+
+    def merge_state(self, state):
+        """Add the series of an exported state (e.g. another process's) to this registry"""
+        with self._lock:
+            for name, series in state['counters'].items():
+                for key, value in series:
+                    self._counters[name][tuple(tuple(pair) for pair in key)] += value
+            for name, histogram in state['histograms'].items():
+                bounds = self._buckets.setdefault(name, tuple(histogram['buckets']))
+                for key, counts, total, count in histogram['series']:
+                    key = tuple(tuple(pair) for pair in key)
+                    mine = self._histograms[name].get(key)
+                    if mine is None:
+                        mine = self._histograms[name][key] = [[0] * len(bounds), 0.0, 0]
+                    mine[0] = [a + b for a, b in zip(mine[0], counts)]
+                    mine[1] += total
+                    mine[2] += count
+
+    def publish(self, directory):
+        """Write this process's state to directory, for render_directory"""
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp_path = path + ".tmp"
+        with self._publish_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.export_state(), f)
+            os.replace(tmp_path, path)
+
+    def start_publishing(self, directory, interval=5.0):
+        """Publish to directory every interval seconds from a daemon thread"""
+        os.makedirs(directory, exist_ok=True)
+
+        def loop():
+            while True:
+                self.publish(directory)
+                time.sleep(interval)
+
+        threading.Thread(target=loop, name="metrics-publisher", daemon=True).start()
+
+    def render_prometheus(self):
+        """All series in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                bounds = self._buckets[name]
+                lines.append(f"# TYPE {name} histogram")
+                for key, (counts, total, count) in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(bounds, counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def render_directory(directory):
+    """
+    Prometheus text of the summed states published into directory
+
+    Each process's file only ever grows, so the sums never go backwards
+    between scrapes; files of exited processes keep counting.
+    """
+    merged = Metrics(enabled=True)
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                merged.merge_state(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return merged.render_prometheus()
+
+
+def _series_name(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# Shared registry used by every instrumented module
+metrics = Metrics()
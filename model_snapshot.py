@@ -0,0 +1,109 @@
+"""
+Pinned local model snapshots for strictly offline loading
+
+Download once (pinned to a commit), then point the app at the directory:
+
+    python model_snapshot.py sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2 models/minilm
+    PLAGIARISM_MODEL_DIR=models/minilm python app.py
+
+A snapshot.json manifest records the model, the resolved commit and the
+SHA-256 of every file; `--verify` checks a snapshot against it.
+"""
+import hashlib
+import json
+import os
+
+MANIFEST = "snapshot.json"
+
+# Weights for other runtimes are never needed by the detector
+IGNORE_PATTERNS = ["*.onnx", "onnx/*", "openvino/*", "*.h5", "*.msgpack", "*.ot",
+                   "tf_model*", "flax_model*", "rust_model*"]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _snapshot_files(directory):
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory)
+            if relative != MANIFEST and not relative.startswith(".cache"):
+                files.append(relative)
+    return sorted(files)
+
+
+def download_snapshot(model_name, target_dir, revision=None):
+    """
+    Download model_name at revision (default: current main) into target_dir
+
+    The revision is resolved to a commit hash, so the snapshot is pinned
+    even when a branch name is given.
+
+    Returns:
+        the manifest dict written to target_dir/snapshot.json
+    """
+    from huggingface_hub import HfApi, snapshot_download
+
+    commit = HfApi().model_info(model_name, revision=revision).sha
+    snapshot_download(model_name, revision=commit, local_dir=target_dir,
+                      ignore_patterns=IGNORE_PATTERNS)
+
+    manifest = {
+        'model': model_name,
+        'revision': commit,
+        'files': {name: _sha256(os.path.join(target_dir, name)) for name in _snapshot_files(target_dir)},
+    }
+    with open(os.path.join(target_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def verify_snapshot(target_dir):
+    """
+    Check every file of a snapshot against its manifest
+
+    Returns:
+        list of problems (empty if the snapshot is intact)
+    """
+    with open(os.path.join(target_dir, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    problems = []
+    for name, expected in manifest['files'].items():
+        path = os.path.join(target_dir, name)
+        if not os.path.exists(path):
+            problems.append(f"missing: {name}")
+        elif _sha256(path) != expected:
+            problems.append(f"modified: {name}")
+    for name in set(_snapshot_files(target_dir)) - set(manifest['files']):
+        problems.append(f"unexpected: {name}")
+    return problems
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Download or verify a pinned local model snapshot")
+    parser.add_argument("model", nargs="?", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("target_dir")
+    parser.add_argument("--revision", default=None, help="branch, tag or commit to pin (default: main)")
+    parser.add_argument("--verify", action="store_true", help="only verify an existing snapshot")
+    args = parser.parse_args()
+
+    if args.verify:
+        problems = verify_snapshot(args.target_dir)
+        for problem in problems:
+            print(problem)
+        print("Snapshot is intact" if not problems else f"{len(problems)} problem(s) found")
+        sys.exit(1 if problems else 0)
+
+    manifest = download_snapshot(args.model, args.target_dir, args.revision)
+    print(f"Pinned {manifest['model']}@{manifest['revision']} ({len(manifest['files'])} files) in {args.target_dir}")
@@ -1,142 +1,930 @@
-from transformers import AutoTokenizer, AutoModel
-import torch
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-
-class MultilingualPlagiarismDetector:
-    def __init__(self, model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"):
-        """
-        Initialize with multilingual pre-trained Hugging Face model
-        
-        Supports 50+ languages including:
-        - English, Tamil, Hindi, Telugu, Bengali, Marathi
-        - Spanish, French, German, Chinese, Japanese, Korean
-        - And many more!
-        
-        Args:
-            model_name: Name of pre-trained multilingual model from Hugging Face Hub
-        """
-        print(f"Loading multilingual pre-trained model: {model_name}")
-        
-        # Load pre-trained tokenizer from Hugging Face
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        
-        # Load pre-trained model from Hugging Face
-        self.model = AutoModel.from_pretrained(model_name)
-        
-        # Set to evaluation mode (no training!)
-        self.model.eval()
-        
-        print("✅ Multilingual model loaded successfully!")
-        print("   Supports: Tamil, English, Hindi, Telugu, Bengali, and 45+ more languages")
-    
-    def get_embedding(self, text):
-        """
-        Convert text to embedding using pre-trained multilingual model
-        Works for ANY language - NO TRAINING REQUIRED!
-        """
-        # Tokenize using pre-trained tokenizer
-        inputs = self.tokenizer(text, return_tensors="pt", 
-                               padding=True, truncation=True, max_length=512)
-        
-        # Get embeddings using pre-trained model (no gradient computation)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-        
-        # Mean pooling
-        embeddings = outputs.last_hidden_state.mean(dim=1)
-        return embeddings.numpy()[0]
-    
-    def split_into_sentences(self, text):
-        """Split text into sentences - works for multiple languages"""
-        # Handle multiple sentence endings (English, Tamil, Hindi, etc.)
-        sentences = text.replace('!', '.').replace('?', '.').replace('।', '.').replace('|', '.').split('.')
-        return [s.strip() for s in sentences if len(s.strip()) > 10]
-    
-    def check_plagiarism(self, text1, text2, threshold=0.8):
-        """
-        Check plagiarism between two texts using multilingual pre-trained model
-        Works even if documents are in DIFFERENT languages!
-        
-        Returns:
-            plagiarism_percentage: float
-            matching_sentences: list of dicts
-        """
-        # Split into sentences
-        sentences1 = self.split_into_sentences(text1)
-        sentences2 = self.split_into_sentences(text2)
-        
-        if not sentences1 or not sentences2:
-            return 0, []
-        
-        print(f"Analyzing {len(sentences1)} sentences from Doc1 vs {len(sentences2)} from Doc2")
-        print("Using multilingual pre-trained embeddings (supports Tamil, Hindi, English, etc.)...")
-        
-        # Get embeddings using pre-trained model
-        embeddings1 = [self.get_embedding(s) for s in sentences1]
-        embeddings2 = [self.get_embedding(s) for s in sentences2]
-        
-        # Calculate similarity matrix
-        similarity_matrix = cosine_similarity(embeddings1, embeddings2)
-        
-        # Find matches
-        matches = []
-        for i, sent1 in enumerate(sentences1):
-            max_sim = np.max(similarity_matrix[i])
-            if max_sim >= threshold:
-                best_match_idx = np.argmax(similarity_matrix[i])
-                matches.append({
-                    'original': sent1,
-                    'matched': sentences2[best_match_idx],
-                    'similarity': float(max_sim),
-                    'sentence_num': i + 1
-                })
-        
-        plagiarism_pct = (len(matches) / len(sentences1)) * 100
-        
-        return plagiarism_pct, matches
-
-# Example usage showing multilingual capability
-if __name__ == "__main__":
-    print("="*60)
-    print("MULTILINGUAL PLAGIARISM DETECTOR")
-    print("="*60)
-    
-    # Initialize detector (downloads multilingual pre-trained model)
-    detector = MultilingualPlagiarismDetector()
-    
-    print("\n" + "="*60)
-    print("MODEL INFO:")
-    print("- Source: Hugging Face Model Hub")
-    print("- Model: paraphrase-multilingual-MiniLM-L12-v2")
-    print("- Languages: 50+ including Tamil, Hindi, English")
-    print("- Pre-trained: YES ✅")
-    print("- Training required: NO ❌")
-    print("="*60 + "\n")
-    
-    # Test with English
-    doc1_en = """
-    Machine learning is a subset of artificial intelligence. It enables computers 
-    to learn from data without being explicitly programmed.
-    """
-    
-    doc2_en = """
-    ML is part of AI technology. It allows systems to learn from data automatically.
-    """
-    
-    print("Test 1: English documents")
-    pct, matches = detector.check_plagiarism(doc1_en, doc2_en)
-    print(f"Plagiarism: {pct:.1f}%\n")
-    
-    # Test with Tamil (example)
-    doc1_ta = """
-    இயந்திர கற்றல் செயற்கை நுண்ணறிவின் ஒரு பகுதி. இது கணினிகள் தரவுகளிலிருந்து கற்றுக்கொள்ள உதவுகிறது.
-    """
-    
-    doc2_ta = """
-    இயந்திர கற்றல் AI தொழில்நுட்பத்தின் பகுதியாகும். இது அமைப்புகளை தானாக தரவுகளிலிருந்து கற்க அனுமதிக்கிறது.
-    """
-    
-    print("Test 2: Tamil documents")
-    pct_ta, matches_ta = detector.check_plagiarism(doc1_ta, doc2_ta)
-    print(f"Plagiarism: {pct_ta:.1f}%\n")
\ No newline at end of file
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import make_key
+from embedding_store import normalize_rows
+from fingerprint import LexicalFingerprinter
+from language_detection import detect_language
+from metrics import BATCH_SIZE_BUCKETS, metrics
+from segmentation import iter_sentences, split_sentences
+from similarity import best_matches
+
+logger = logging.getLogger(__name__)
+
+# Sentences encoded between two progress reports in check_plagiarism
+PROGRESS_CHUNK_SIZE = 256
+
+def _no_progress(fraction, stage):
+    pass
+
+def _windows(num_sentences, size):
+    """(start, end) ranges of consecutive, non-overlapping sentence windows"""
+    return [(start, min(start + size, num_sentences)) for start in range(0, num_sentences, size)]
+
+class _DocumentState:
+    """What recheck remembers about one document between revisions"""
+    
+    def __init__(self, settings, sentences2, reference_index, embeddings2):
+        # Threshold and prefilter settings the results below were computed with
+        self.settings = settings
+        self.sentences2 = sentences2
+        self.reference_index = reference_index
+        self.embeddings2 = embeddings2
+        # sentence text -> (stage, index in sentences2, score), or None when unmatched
+        self.results = {}
+        # sentence text -> embedding, for sentences that went through the model
+        self.embeddings1 = {}
+        self.lock = threading.Lock()
+
+class MultilingualPlagiarismDetector:
+    def __init__(self, model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                 cache=None, backend="torch", num_threads=None, onnx_path=None,
+                 prefilter=True, lexical_threshold=0.9, similarity_memory_mb=256,
+                 max_document_states=100, hierarchical=False, window_size=6,
+                 window_threshold=0.5, max_candidate_windows=8, local_files_only=False,
+                 num_layers=None, draft_model=None, draft_layers=None, cascade_margin=0.1,
+                 cascade_candidates=4, draft_threshold=None):
+        """
+        Initialize with multilingual pre-trained Hugging Face model
+        
+        Supports 50+ languages including:
+        - English, Tamil, Hindi, Telugu, Bengali, Marathi
+        - Spanish, French, German, Chinese, Japanese, Korean
+        - And many more!
+        
+        Args:
+            model_name: Name of pre-trained multilingual model from Hugging Face Hub
+            cache: Optional EmbeddingCache shared across checks (and processes, if disk-backed)
+            backend: "torch" (fp32), "torch-int8" (dynamic quantization) or "onnx" (onnxruntime)
+            num_threads: Intra-op CPU threads for inference (None = library default)
+            onnx_path: Where to export/reuse the ONNX graph for the onnx backend
+            prefilter: Find (near-)verbatim copies with MinHash/LSH before running the model
+            lexical_threshold: Minimum shingle Jaccard similarity for a lexical match
+            similarity_memory_mb: Memory cap for similarity tiles (the full matrix is never built)
+            max_document_states: Documents whose state recheck keeps (least recently used are dropped)
+            hierarchical: Match windows of sentences first, then sentences only inside similar windows
+            window_size: Sentences per window in hierarchical mode
+            window_threshold: Minimum window similarity for a candidate region (looser than threshold)
+            max_candidate_windows: Most reference windows searched per window of document 1
+            local_files_only: Never contact the Hub (model_name must be a local snapshot or cached)
+            num_layers: Run only the first num_layers transformer layers (cheaper, less accurate)
+            draft_model: Cheaper model deciding clear-cut same-language pairs (enables the cascade)
+            draft_layers: Layers of the draft model (draft_layers alone drafts with the first
+                layers of model_name)
+            cascade_margin: Draft scores within this distance of the draft threshold go to the full model
+            cascade_candidates: Draft candidates re-scored by the full model for a borderline sentence
+            draft_threshold: Draft score standing for the full model's threshold (None = the same
+                threshold); a truncated or different draft model scores on its own scale, see
+                calibrate_draft
+        """
+        logger.info("Loading multilingual pre-trained model: %s", model_name)
+        
+        self.model_name = model_name
+        self.cache = cache
+        self.backend = backend
+        # Quantized backends and truncated models produce different vectors; keep them apart in the cache
+        self._cache_namespace = model_name if backend == "torch" else f"{model_name}@{backend}"
+        if num_layers is not None:
+            self._cache_namespace += f"@{num_layers}layers"
+        
+        self.prefilter = prefilter
+        self.lexical_threshold = lexical_threshold
+        self.similarity_memory_mb = similarity_memory_mb
+        self.fingerprinter = LexicalFingerprinter()
+        self.hierarchical = hierarchical
+        self.window_size = window_size
+        self.window_threshold = window_threshold
+        self.max_candidate_windows = max_candidate_windows
+        self.cascade_margin = cascade_margin
+        self.cascade_candidates = cascade_candidates
+        self.draft_threshold = draft_threshold
+        # Optional MicroBatchScheduler shared by concurrent check_plagiarism calls
+        self.batch_scheduler = None
+        # Per-document state for incremental rechecks of revised drafts
+        self.max_document_states = max_document_states
+        self._document_states = OrderedDict()
+        self._document_states_lock = threading.Lock()
+        
+        # Heavy dependencies are imported on first use, so importing this module stays cheap
+        from transformers import AutoModel, AutoTokenizer
+        from inference_backends import load_backend
+        
+        # Load pre-trained tokenizer from Hugging Face
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_files_only)
+        
+        # Load pre-trained model from Hugging Face
+        layer_kwargs = {} if num_layers is None else {'num_hidden_layers': num_layers}
+        self.model = AutoModel.from_pretrained(model_name, local_files_only=local_files_only, **layer_kwargs)
+        
+        # Set to evaluation mode (no training!)
+        self.model.eval()
+        
+        # Forward function for the selected inference backend
+        self._forward = load_backend(self.model, backend, num_threads, onnx_path)
+        
+        logger.info("Multilingual model loaded (backend: %s); supports Tamil, English, Hindi, "
+                    "Telugu, Bengali, and 45+ more languages", backend)
+        
+        # Cheaper first tier of the model cascade (see _cascade_matches)
+        self.draft = None
+        if draft_model is not None or draft_layers is not None:
+            self.draft = MultilingualPlagiarismDetector(
+                draft_model or model_name, cache=cache, backend="torch" if backend == "onnx" else backend,
+                num_threads=num_threads, prefilter=False, similarity_memory_mb=similarity_memory_mb,
+                local_files_only=local_files_only, num_layers=draft_layers)
+    
+    def get_embedding(self, text):
+        """
+        Convert text to embedding using pre-trained multilingual model
+        Works for ANY language - NO TRAINING REQUIRED!
+        """
+        if self.cache is not None:
+            return self.encode_batch([text])[0]
+        
+        # Tokenize using pre-trained tokenizer
+        inputs = self.tokenizer(text, return_tensors="pt", 
+                               padding=True, truncation=True, max_length=512)
+        
+        # Get embeddings using pre-trained model (no gradient computation)
+        return self.embed_inputs(inputs)[0]
+    
+    def encode_batch(self, sentences, batch_size=32):
+        """
+        Convert many sentences to embeddings with batched forward passes
+        
+        Sentences are sorted by token length so every batch is padded only
+        to its own longest sentence instead of the longest in the document.
+        Repeated sentences are encoded once, and sentences already in the
+        embedding cache are not encoded at all.
+        
+        Args:
+            sentences: list of sentences to encode
+            batch_size: number of sentences per forward pass
+        
+        Returns:
+            numpy array of shape (len(sentences), hidden_size), in input order
+        """
+        hidden_size = self.model.config.hidden_size
+        embeddings = np.empty((len(sentences), hidden_size), dtype=np.float32)
+        if len(sentences) == 0:
+            return embeddings
+        
+        # Encode each distinct sentence only once
+        unique_index = {}
+        positions = [unique_index.setdefault(s, len(unique_index)) for s in sentences]
+        unique_sentences = list(unique_index)
+        unique_embeddings = np.empty((len(unique_sentences), hidden_size), dtype=np.float32)
+        
+        to_encode = list(range(len(unique_sentences)))
+        if self.cache is not None:
+            keys = [make_key(self._cache_namespace, s) for s in unique_sentences]
+            cached = self.cache.get_many(keys)
+            metrics.inc('embedding_cache_lookups', len(cached), result='hit')
+            metrics.inc('embedding_cache_lookups', len(keys) - len(cached), result='miss')
+            to_encode = []
+            for i, key in enumerate(keys):
+                if key in cached:
+                    unique_embeddings[i] = cached[key]
+                else:
+                    to_encode.append(i)
+        
+        if to_encode:
+            fresh = self._encode_uncached([unique_sentences[i] for i in to_encode], batch_size)
+            unique_embeddings[to_encode] = fresh
+            if self.cache is not None:
+                self.cache.put_many((keys[i], fresh[j]) for j, i in enumerate(to_encode))
+        
+        embeddings[:] = unique_embeddings[positions]
+        return embeddings
+    
+    def _encode_uncached(self, sentences, batch_size):
+        """Run length-bucketed batched forward passes over sentences"""
+        hidden_size = self.model.config.hidden_size
+        
+        # Tokenize once without padding so we can bucket by length
+        with metrics.timer('tokenization'):
+            encoded = self.tokenizer(list(sentences), truncation=True, max_length=512)
+        lengths = np.array([len(ids) for ids in encoded['input_ids']])
+        order = np.argsort(-lengths, kind='stable')
+        
+        embeddings = np.empty((len(sentences), hidden_size), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start:start + batch_size]
+            features = {key: [encoded[key][i] for i in batch_idx] for key in encoded.keys()}
+            # Pad only up to the longest sentence in this bucket
+            with metrics.timer('tokenization'):
+                inputs = self.tokenizer.pad(features, padding=True, return_tensors="pt")
+            
+            if metrics.active:
+                mask = inputs['attention_mask']
+                metrics.inc('forward_batches')
+                metrics.observe('forward_batch_size', len(batch_idx), buckets=BATCH_SIZE_BUCKETS)
+                metrics.inc('forward_tokens', int(mask.sum()), kind='real')
+                metrics.inc('forward_tokens', mask.numel(), kind='padded')
+            embeddings[batch_idx] = self.embed_inputs(inputs)
+        
+        return embeddings
+    
+    def embed_inputs(self, inputs):
+        """Model forward pass plus mean pooling on already tokenized inputs"""
+        with metrics.timer('forward'):
+            last_hidden_state = self._forward(inputs)
+            return self._mean_pool(last_hidden_state, inputs['attention_mask']).numpy()
+    
+    @staticmethod
+    def _mean_pool(last_hidden_state, attention_mask):
+        """Mean of token embeddings, ignoring padding positions"""
+        mask = attention_mask.unsqueeze(-1).to(last_hidden_state.dtype)
+        summed = (last_hidden_state * mask).sum(dim=1)
+        counts = mask.sum(dim=1).clamp(min=1e-9)
+        return summed / counts
+    
+    def warm_up(self):
+        """
+        Pay one-time costs (kernel selection, allocator growth, lazy
+        initialization) before the first real request
+        
+        Runs the model on batches of several sizes and lengths, bypassing the
+        embedding cache, and exercises segmentation, fingerprinting and
+        similarity on the bundled examples.
+        """
+        start = time.perf_counter()
+        sentences = [sentence for doc1, doc2 in EXAMPLE_DOCUMENTS.values()
+                     for sentence in self.split_into_sentences(doc1 + doc2)]
+        for batch_size in (1, 32):
+            embeddings = self._encode_uncached((sentences * batch_size)[:batch_size], batch_size)
+        best_matches(embeddings, embeddings)
+        self.fingerprinter.match_sentences(sentences, sentences)
+        if self.draft is not None:
+            self.draft.warm_up()
+        logger.info("Warm-up finished in %.2fs", time.perf_counter() - start)
+    
+    def encode_stream(self, sentences, chunk_size=256, batch_size=32):
+        """
+        Encode an iterable of sentences lazily, chunk by chunk
+        
+        Accepts plain strings or Sentence tuples (e.g. from iter_sentences),
+        so encoding of a huge document starts before it is fully split.
+        
+        Yields:
+            (chunk, embeddings) with chunk being the list of consumed items
+        """
+        chunk = []
+        for sentence in sentences:
+            chunk.append(sentence)
+            if len(chunk) >= chunk_size:
+                yield chunk, self.encode_batch([getattr(s, 'text', s) for s in chunk], batch_size)
+                chunk = []
+        if chunk:
+            yield chunk, self.encode_batch([getattr(s, 'text', s) for s in chunk], batch_size)
+    
+    def split_into_sentences(self, text):
+        """Split text (or a list of page texts) into sentences - works for multiple languages"""
+        # Handles sentence endings of English, Tamil, Hindi, Chinese, Arabic, Urdu, etc.
+        return split_sentences(text)
+    
+    def check_plagiarism(self, text1, text2, threshold=0.8, prefilter=None, progress=None, hierarchical=None,
+                         on_matches=None, cascade=None, details=None):
+        """
+        Check plagiarism between two texts using multilingual pre-trained model
+        Works even if documents are in DIFFERENT languages!
+        
+        Either text may also be a list of page texts; matches then carry the
+        page numbers of both sentences as well as character offsets.
+        
+        With the lexical prefilter on, (near-)verbatim copies are found by
+        MinHash/LSH first and only the remaining sentences are embedded.
+        Each match records the stage that found it ('lexical' or 'semantic').
+        details, if given, is a dict that receives this call's 'timings'
+        (seconds per stage) and 'stats' (comparison counts); the detector
+        itself keeps no per-call state, so concurrent checks can share it.
+        
+        progress, if given, is called as progress(fraction, stage) with the
+        real completion of segmentation, lexical, encoding and matching.
+        on_matches, if given, is called with each batch of new match dicts as
+        soon as it is found (lexical matches first, then semantic matches
+        chunk by chunk), before the final sorted list is returned.
+        
+        With hierarchical=True, windows of sentences are matched first and
+        sentences are only embedded and compared inside similar windows (see
+        hierarchical_recall to measure what this misses).
+        
+        With a draft model configured (and cascade not False), same-language
+        pairs are scored by the draft model first (against draft_threshold)
+        and only cross-language pairs and borderline draft scores reach the
+        full model; semantic matches then record the tier that decided them
+        ('draft' or 'full'). Hierarchical mode takes precedence over the
+        cascade.
+        
+        Returns:
+            plagiarism_percentage: float
+            matching_sentences: list of dicts
+        """
+        if prefilter is None:
+            prefilter = self.prefilter
+        if hierarchical is None:
+            hierarchical = self.hierarchical
+        if cascade is None:
+            cascade = self.draft is not None
+        if progress is None:
+            progress = _no_progress
+        draft_threshold = threshold if self.draft_threshold is None else self.draft_threshold
+        timings = {}
+        stats = {}
+        if details is not None:
+            details.update(timings=timings, stats=stats)
+        progress(0.0, 'segmentation')
+        
+        # Split into sentences (with source offsets and pages)
+        with metrics.timer('segmentation'):
+            segments1 = list(iter_sentences(text1))
+            segments2 = list(iter_sentences(text2))
+        sentences1 = [segment.text for segment in segments1]
+        sentences2 = [segment.text for segment in segments2]
+        
+        if not sentences1 or not sentences2:
+            return 0, []
+        
+        logger.info("Analyzing %d sentences from Doc1 vs %d from Doc2", len(sentences1), len(sentences2))
+        metrics.inc('checks')
+        metrics.inc('sentences', len(sentences1), document='1')
+        metrics.inc('sentences', len(sentences2), document='2')
+        
+        matches = []
+        progress(0.05, 'lexical')
+        
+        # Stage 1: lexical fingerprints catch verbatim copies without the model
+        lexical_matches = {}
+        if prefilter:
+            start = time.perf_counter()
+            with metrics.timer('lexical'):
+                lexical_matches = self.fingerprinter.match_sentences(
+                    sentences1, sentences2, max(self.lexical_threshold, threshold))
+            metrics.inc('matches', len(lexical_matches), stage='lexical')
+            for i, (j, score) in lexical_matches.items():
+                matches.append(self._match(segments1, segments2, i, j, score, 'lexical'))
+            if matches and on_matches is not None:
+                on_matches(list(matches))
+            timings['lexical'] = time.perf_counter() - start
+        
+        # Stage 2: semantic embeddings for everything the lexical stage did not settle
+        remaining = [i for i in range(len(sentences1)) if i not in lexical_matches]
+        if remaining:
+            if hierarchical:
+                batches = self._coarse_to_fine_matches(sentences1, sentences2, remaining, progress,
+                                                       timings, stats)
+            elif cascade and self.draft is not None:
+                batches = self._cascade_matches(sentences1, sentences2, remaining, draft_threshold, progress,
+                                                timings, stats)
+            else:
+                batches = self._exhaustive_matches(sentences1, sentences2, remaining, progress, timings, stats)
+            for rows, cols, scores, tier in batches:
+                # Find matches (draft scores are on the draft model's own scale)
+                cutoff = draft_threshold if tier == 'draft' else threshold
+                found = [self._match(segments1, segments2, rows[k], cols[k], scores[k], 'semantic')
+                         for k in np.flatnonzero(scores >= cutoff)]
+                if tier is not None:
+                    for match in found:
+                        match['tier'] = tier
+                metrics.inc('matches', len(found), stage='semantic')
+                matches.extend(found)
+                if found and on_matches is not None:
+                    on_matches(found)
+        
+        matches.sort(key=lambda match: match['sentence_num'])
+        plagiarism_pct = (len(matches) / len(sentences1)) * 100
+        progress(1.0, 'matching')
+        
+        logger.info("Stage timings: %s", ", ".join(f"{stage} {seconds:.3f}s"
+                                                   for stage, seconds in timings.items()))
+        
+        return plagiarism_pct, matches
+    
+    def _encode_with_progress(self, sentences, progress, begin, end):
+        """Encode in chunks, reporting progress from begin to end; repeated sentences are encoded once"""
+        unique = {}
+        positions = [unique.setdefault(sentence, len(unique)) for sentence in sentences]
+        texts = list(unique)
+        encode = self.batch_scheduler.encode if self.batch_scheduler else self.encode_batch
+        parts = []
+        # Wall time of the whole stage, including any wait for the batch scheduler
+        with metrics.timer('encoding'):
+            for chunk_start in range(0, len(texts), PROGRESS_CHUNK_SIZE):
+                parts.append(encode(texts[chunk_start:chunk_start + PROGRESS_CHUNK_SIZE]))
+                done = min(chunk_start + PROGRESS_CHUNK_SIZE, len(texts)) / len(texts)
+                progress(begin + (end - begin) * done, 'encoding')
+        if not parts:
+            return np.empty((0, self.model.config.hidden_size), dtype=np.float32)
+        return np.concatenate(parts)[np.asarray(positions, dtype=np.int64)]
+    
+    def _encode_reference_first(self, reference, sentences, progress, begin, end, timings, timing_key):
+        """
+        Encode every distinct sentence of reference and sentences once, reference first
+        
+        Progress is reported from begin to end; encoding seconds are added to
+        timings[timing_key].
+        
+        Returns:
+            reference embeddings, and an iterator of (start, end, embeddings)
+            over sentences in PROGRESS_CHUNK_SIZE chunks, each chunk's new
+            sentences encoded only when the iterator reaches it
+        """
+        start = time.perf_counter()
+        unique = {}
+        ids2 = [unique.setdefault(sentence, len(unique)) for sentence in reference]
+        reference_count = len(unique)
+        ids1 = np.array([unique.setdefault(sentence, len(unique)) for sentence in sentences], dtype=np.int64)
+        texts = list(unique)
+        logger.debug("Encoding %d sentences (%d unique) with %s", len(reference) + len(sentences),
+                     len(texts), self.model_name)
+        middle = begin + (end - begin) * (reference_count / len(texts) if texts else 1.0)
+        
+        unique_embeddings = np.empty((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        unique_embeddings[:reference_count] = self._encode_with_progress(texts[:reference_count], progress,
+                                                                         begin, middle)
+        timings[timing_key] = timings.get(timing_key, 0.0) + time.perf_counter() - start
+        
+        def chunks():
+            encoded = reference_count
+            for chunk_start in range(0, len(ids1), PROGRESS_CHUNK_SIZE):
+                chunk_ids = ids1[chunk_start:chunk_start + PROGRESS_CHUNK_SIZE]
+                # Ids of new sentences grow with position, so this chunk needs everything up to its largest id
+                needed = max(encoded, int(chunk_ids.max()) + 1)
+                if needed > encoded:
+                    start = time.perf_counter()
+                    unique_embeddings[encoded:needed] = self._encode_with_progress(
+                        texts[encoded:needed], _no_progress, 0.0, 0.0)
+                    encoded = needed
+                    timings[timing_key] += time.perf_counter() - start
+                progress(middle + (end - middle) * (encoded - reference_count) / max(1, len(texts) - reference_count),
+                         'encoding')
+                yield chunk_start, chunk_start + len(chunk_ids), unique_embeddings[chunk_ids]
+        
+        return unique_embeddings[ids2], chunks()
+    
+    def _exhaustive_matches(self, sentences1, sentences2, remaining, progress, timings, stats):
+        """
+        Best match of every remaining sentence among all sentences of document 2
+        
+        Yields (rows, best ids, best scores, None) chunk by chunk: the reference is
+        encoded first, so every chunk of document 1 is matched (and can be
+        reported) as soon as its new sentences are encoded.
+        """
+        # Get embeddings using pre-trained model (batched, length-bucketed)
+        progress(0.1, 'encoding')
+        embeddings2, chunks = self._encode_reference_first(sentences2, [sentences1[i] for i in remaining],
+                                                           progress, 0.1, 0.9, timings, 'embedding')
+        # Normalized once here rather than again for every chunk of document 1
+        embeddings2 = normalize_rows(embeddings2)
+        timings['similarity'] = 0.0
+        
+        for chunk_start, chunk_end, embeddings1 in chunks:
+            # Best cosine match per sentence, computed tile by tile
+            start = time.perf_counter()
+            with metrics.timer('similarity'):
+                result = best_matches(normalize_rows(embeddings1), embeddings2,
+                                      memory_limit_mb=self.similarity_memory_mb, normalized=True)
+            timings['similarity'] += time.perf_counter() - start
+            yield np.asarray(remaining[chunk_start:chunk_end]), result.row_ids[:, 0], result.row_scores[:, 0], None
+        
+        progress(0.9, 'matching')
+        stats['sentence_comparisons'] = len(remaining) * len(sentences2)
+        metrics.inc('sentence_comparisons', stats['sentence_comparisons'], mode='exhaustive')
+    
+    def _coarse_to_fine_matches(self, sentences1, sentences2, remaining, progress, timings, stats):
+        """
+        Best matches searched only inside similar regions of the two documents
+        (yields a single (rows, best ids, best scores, None) batch)
+        
+        Windows of consecutive sentences are embedded and compared first; a
+        sentence is then compared only with the sentences of the (at most
+        max_candidate_windows) windows of document 2 whose similarity to its
+        own window reaches window_threshold. Sentences outside every candidate
+        region are never encoded.
+        """
+        start = time.perf_counter()
+        windows1 = _windows(len(sentences1), self.window_size)
+        windows2 = _windows(len(sentences2), self.window_size)
+        texts = ([" ".join(sentences1[a:b]) for a, b in windows1] +
+                 [" ".join(sentences2[a:b]) for a, b in windows2])
+        progress(0.1, 'encoding')
+        window_embeddings = self._encode_with_progress(texts, progress, 0.1, 0.4)
+        with metrics.timer('window_similarity'):
+            coarse = best_matches(window_embeddings[:len(windows1)], window_embeddings[len(windows1):],
+                                  k=min(self.max_candidate_windows, len(windows2)),
+                                  memory_limit_mb=self.similarity_memory_mb)
+        timings['windows'] = time.perf_counter() - start
+        stats['window_comparisons'] = len(windows1) * len(windows2)
+        
+        # Candidate regions: remaining sentences of a window x sentences of its similar windows
+        remaining_set = set(remaining)
+        regions = []
+        for w, (a, b) in enumerate(windows1):
+            rows = [i for i in range(a, b) if i in remaining_set]
+            hits = coarse.row_ids[w][coarse.row_scores[w] >= self.window_threshold]
+            if rows and len(hits):
+                regions.append((rows, sorted({j for h in hits for j in range(*windows2[h])})))
+        
+        start = time.perf_counter()
+        needed1 = sorted({i for rows, _ in regions for i in rows})
+        needed2 = sorted({j for _, cols in regions for j in cols})
+        embeddings = self._encode_with_progress([sentences1[i] for i in needed1] + [sentences2[j] for j in needed2],
+                                                progress, 0.4, 0.9)
+        embeddings1 = embeddings[:len(needed1)]
+        embeddings2 = embeddings[len(needed1):]
+        position1 = {i: k for k, i in enumerate(needed1)}
+        position2 = {j: k for k, j in enumerate(needed2)}
+        timings['embedding'] = time.perf_counter() - start
+        start = time.perf_counter()
+        progress(0.9, 'matching')
+        
+        found_rows, found_cols, found_scores = [], [], []
+        comparisons = 0
+        with metrics.timer('similarity'):
+            for rows, cols in regions:
+                result = best_matches(embeddings1[[position1[i] for i in rows]],
+                                      embeddings2[[position2[j] for j in cols]],
+                                      memory_limit_mb=self.similarity_memory_mb)
+                found_rows.extend(rows)
+                found_cols.extend(np.asarray(cols)[result.row_ids[:, 0]])
+                found_scores.extend(result.row_scores[:, 0])
+                comparisons += len(rows) * len(cols)
+        timings['similarity'] = time.perf_counter() - start
+        stats['sentence_comparisons'] = comparisons
+        metrics.inc('sentence_comparisons', comparisons, mode='hierarchical')
+        yield (np.asarray(found_rows, dtype=np.int64), np.asarray(found_cols, dtype=np.int64),
+               np.asarray(found_scores, dtype=np.float32), None)
+    
+    def _cascade_matches(self, sentences1, sentences2, remaining, draft_threshold, progress, timings, stats):
+        """
+        Best matches found by the draft model where it is trusted, by the full model elsewhere
+        
+        Every sentence is tagged with a cheap script/language guess. Same-
+        language pairs are scored by the draft model first: a sentence whose
+        best draft score clears draft_threshold + cascade_margin is decided
+        there, and one below draft_threshold - cascade_margin has no same-
+        language match. The full model only scores cross-language pairs and
+        re-scores the top cascade_candidates draft candidates of borderline
+        sentences.
+        
+        Yields (rows, best ids, best scores, tier): draft-tier decisions chunk
+        by chunk as document 1 is encoded, then the full tier once.
+        """
+        start = time.perf_counter()
+        with metrics.timer('language_detection'):
+            languages1 = np.array([detect_language(sentences1[i]) for i in remaining])
+            languages2 = np.array([detect_language(sentence) for sentence in sentences2])
+        timings['language_detection'] = time.perf_counter() - start
+        rows = np.asarray(remaining)
+        
+        # Tier 1: the draft model scores same-language pairs only
+        shared = np.intersect1d(languages1, languages2)
+        draft1 = np.flatnonzero(np.isin(languages1, shared))
+        draft2 = np.flatnonzero(np.isin(languages2, shared))
+        own2 = {language: np.flatnonzero(languages2[draft2] == language) for language in shared}
+        progress(0.1, 'encoding')
+        draft_embeddings2, chunks = self.draft._encode_reference_first(
+            [sentences2[j] for j in draft2], [sentences1[rows[r]] for r in draft1],
+            progress, 0.1, 0.4, timings, 'draft_embedding')
+        draft_embeddings2 = normalize_rows(draft_embeddings2)
+        
+        k = self.cascade_candidates
+        draft_scores = np.full(len(rows), -np.inf, dtype=np.float32)
+        candidates = np.full((len(rows), k), -1, dtype=np.int64)
+        draft_comparisons = 0
+        timings['similarity'] = 0.0
+        for chunk_start, chunk_end, chunk_embeddings in chunks:
+            chunk = draft1[chunk_start:chunk_end]
+            chunk_embeddings = normalize_rows(chunk_embeddings)
+            start = time.perf_counter()
+            with metrics.timer('similarity'):
+                for language in shared:
+                    own1 = np.flatnonzero(languages1[chunk] == language)
+                    if not len(own1):
+                        continue
+                    targets = draft2[own2[language]]
+                    result = best_matches(chunk_embeddings[own1], draft_embeddings2[own2[language]], k=k,
+                                          memory_limit_mb=self.similarity_memory_mb, normalized=True)
+                    found = result.row_ids.shape[1]
+                    draft_scores[chunk[own1]] = result.row_scores[:, 0]
+                    candidates[chunk[own1], :found] = np.where(result.row_ids >= 0, targets[result.row_ids], -1)
+                    draft_comparisons += len(own1) * len(targets)
+            timings['similarity'] += time.perf_counter() - start
+            # Clear draft matches are final: report them before the full model runs
+            decided = chunk[draft_scores[chunk] >= draft_threshold + self.cascade_margin]
+            if len(decided):
+                yield rows[decided], candidates[decided, 0], draft_scores[decided], 'draft'
+        
+        accepted = draft_scores >= draft_threshold + self.cascade_margin
+        borderline = ~accepted & (draft_scores >= draft_threshold - self.cascade_margin)
+        
+        # Tier 2: the full model scores cross-language pairs and re-scores borderline candidates
+        start = time.perf_counter()
+        cross_language = {language: np.flatnonzero(languages2 != language) for language in np.unique(languages1)}
+        full_rows = np.flatnonzero(~accepted & (borderline | np.array([len(cross_language[language]) > 0
+                                                                        for language in languages1], dtype=bool)))
+        needed2 = set(candidates[full_rows[borderline[full_rows]]].ravel().tolist()) - {-1}
+        for language in np.unique(languages1[full_rows]):
+            needed2.update(cross_language[language].tolist())
+        needed2 = np.array(sorted(needed2), dtype=np.int64)
+        embeddings = self._encode_with_progress([sentences1[rows[r]] for r in full_rows] +
+                                                [sentences2[j] for j in needed2], progress, 0.4, 0.9)
+        full_embeddings1 = normalize_rows(embeddings[:len(full_rows)])
+        full_embeddings2 = normalize_rows(embeddings[len(full_rows):])
+        position2 = np.full(len(sentences2), -1, dtype=np.int64)
+        position2[needed2] = np.arange(len(needed2))
+        timings['embedding'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        progress(0.9, 'matching')
+        best_scores = np.full(len(full_rows), -np.inf, dtype=np.float32)
+        best_ids = np.full(len(full_rows), -1, dtype=np.int64)
+        full_comparisons = 0
+        with metrics.timer('similarity'):
+            for language in np.unique(languages1[full_rows]):
+                own = np.flatnonzero(languages1[full_rows] == language)
+                others = cross_language[language]
+                if not len(others):
+                    continue
+                result = best_matches(full_embeddings1[own], full_embeddings2[position2[others]],
+                                      memory_limit_mb=self.similarity_memory_mb, normalized=True)
+                best_scores[own] = result.row_scores[:, 0]
+                best_ids[own] = others[result.row_ids[:, 0]]
+                full_comparisons += len(own) * len(others)
+            
+            unsure = np.flatnonzero(borderline[full_rows])
+            if len(unsure):
+                unsure_candidates = candidates[full_rows[unsure]]
+                scores = np.einsum('nd,nkd->nk', full_embeddings1[unsure],
+                                   full_embeddings2[position2[unsure_candidates]])
+                scores[unsure_candidates < 0] = -np.inf
+                pick = scores.argmax(axis=1)
+                picked = scores[np.arange(len(unsure)), pick]
+                better = picked > best_scores[unsure]
+                best_scores[unsure[better]] = picked[better]
+                best_ids[unsure[better]] = unsure_candidates[better, pick[better]]
+                full_comparisons += int((unsure_candidates >= 0).sum())
+        timings['similarity'] += time.perf_counter() - start
+        
+        decided_by_draft = len(rows) - len(full_rows)
+        stats.update(sentence_comparisons=draft_comparisons + full_comparisons,
+                     draft_comparisons=draft_comparisons, full_comparisons=full_comparisons,
+                     draft_decided=decided_by_draft, full_decided=len(full_rows))
+        metrics.inc('sentence_comparisons', draft_comparisons, mode='cascade_draft')
+        metrics.inc('sentence_comparisons', full_comparisons, mode='cascade_full')
+        metrics.inc('cascade_decisions', decided_by_draft, tier='draft')
+        metrics.inc('cascade_decisions', len(full_rows), tier='full')
+        yield rows[full_rows], best_ids, best_scores, 'full'
+    
+    def calibrate_draft(self, text1, text2, threshold=0.8):
+        """
+        Set draft_threshold so the draft model agrees with the full model on one sample pair
+        
+        Cosine scores of a truncated or different draft model sit on a scale
+        of their own. Every same-language sentence of text1 gets its best
+        same-language score in text2 from both models; the draft threshold is
+        the draft score that flags as many of those sentences as the full
+        model flags at threshold. Use a representative pair with both copied
+        and original sentences.
+        
+        Returns:
+            the new draft_threshold
+        """
+        if self.draft is None:
+            raise ValueError("No draft model configured")
+        sentences1 = self.split_into_sentences(text1)
+        sentences2 = self.split_into_sentences(text2)
+        languages1 = np.array([detect_language(sentence) for sentence in sentences1])
+        languages2 = np.array([detect_language(sentence) for sentence in sentences2])
+        shared = np.intersect1d(languages1, languages2)
+        if not len(shared):
+            raise ValueError("The sample pair has no same-language sentences")
+        
+        full_scores, draft_scores = [], []
+        for language in shared:
+            own1 = [sentences1[i] for i in np.flatnonzero(languages1 == language)]
+            own2 = [sentences2[j] for j in np.flatnonzero(languages2 == language)]
+            for detector, scores in ((self, full_scores), (self.draft, draft_scores)):
+                result = best_matches(detector.encode_batch(own1), detector.encode_batch(own2),
+                                      memory_limit_mb=self.similarity_memory_mb)
+                scores.extend(result.row_scores[:, 0])
+        
+        flagged = int((np.asarray(full_scores) >= threshold).sum())
+        ranked = np.sort(np.asarray(draft_scores, dtype=np.float32))[::-1]
+        if flagged:
+            self.draft_threshold = float(ranked[flagged - 1])
+        else:
+            self.draft_threshold = float(np.nextafter(ranked[0], np.float32(np.inf)))
+        logger.info("Draft threshold %.4f matches the full model at %.2f (%d of %d sentences flagged)",
+                    self.draft_threshold, threshold, flagged, len(ranked))
+        return self.draft_threshold
+    
+    def hierarchical_recall(self, text1, text2, threshold=0.8):
+        """
+        Compare hierarchical matching against the exhaustive mode on one pair
+        
+        Returns:
+            dict with recall (share of exhaustively flagged sentences the
+            hierarchical mode also flags), both sentence comparison counts
+            and both run times
+        """
+        report = {}
+        flagged = {}
+        for mode in ('exhaustive', 'hierarchical'):
+            start = time.perf_counter()
+            details = {}
+            _, matches = self.check_plagiarism(text1, text2, threshold, hierarchical=(mode == 'hierarchical'),
+                                               cascade=False, details=details)
+            report[f'{mode}_seconds'] = time.perf_counter() - start
+            report[f'{mode}_comparisons'] = details['stats'].get('sentence_comparisons', 0)
+            flagged[mode] = {match['sentence_num'] for match in matches}
+        
+        expected = flagged['exhaustive']
+        report['recall'] = len(expected & flagged['hierarchical']) / len(expected) if expected else 1.0
+        return report
+    
+    def recheck(self, document_id, text1, text2, threshold=0.8, progress=None):
+        """
+        Check a new revision of a document, reusing work from earlier revisions
+        
+        Keeps per-document state (reference sentences and embeddings, and the
+        best match of every sentence seen so far). The new revision is diffed
+        against it at sentence level: only added or changed sentences are
+        fingerprinted, encoded and matched, so re-checking a draft that changed
+        by 1% costs roughly 1% of a full check. The reference (text2), the
+        threshold and the prefilter settings must stay the same for results to
+        be reused; otherwise the state is rebuilt (reusing known embeddings).
+        
+        Returns the same (plagiarism_percentage, matches) as check_plagiarism.
+        """
+        if progress is None:
+            progress = _no_progress
+        progress(0.0, 'segmentation')
+        with metrics.timer('segmentation'):
+            segments1 = list(iter_sentences(text1))
+            segments2 = list(iter_sentences(text2))
+        if not segments1 or not segments2:
+            return 0, []
+        
+        state = self._document_state(document_id, [segment.text for segment in segments2], threshold)
+        with state.lock:
+            new_sentences = list(dict.fromkeys(segment.text for segment in segments1
+                                               if segment.text not in state.results))
+            logger.info("Rechecking %s: %d of %d sentences are new", document_id,
+                        len(new_sentences), len(segments1))
+            metrics.inc('recheck_sentences', len(segments1) - len(new_sentences), result='reused')
+            metrics.inc('recheck_sentences', len(new_sentences), result='new')
+            progress(0.05, 'lexical')
+            
+            # Stage 1: lexical fingerprints of the new sentences only
+            if self.prefilter and new_sentences:
+                with metrics.timer('lexical'):
+                    lexical_matches = self.fingerprinter.match_reference(
+                        new_sentences, state.reference_index, max(self.lexical_threshold, threshold))
+                for i, (j, score) in lexical_matches.items():
+                    state.results[new_sentences[i]] = ('lexical', j, score)
+            
+            # Stage 2: embed and match what the lexical stage did not settle
+            to_match = [sentence for sentence in new_sentences if sentence not in state.results]
+            if to_match:
+                progress(0.1, 'encoding')
+                to_encode = [sentence for sentence in to_match if sentence not in state.embeddings1]
+                if to_encode:
+                    encode = self.batch_scheduler.encode if self.batch_scheduler else self.encode_batch
+                    with metrics.timer('encoding'):
+                        state.embeddings1.update(zip(to_encode, encode(to_encode)))
+                progress(0.9, 'matching')
+                with metrics.timer('similarity'):
+                    result = best_matches(np.stack([state.embeddings1[sentence] for sentence in to_match]),
+                                          state.embeddings2, memory_limit_mb=self.similarity_memory_mb)
+                for sentence, score, j in zip(to_match, result.row_scores[:, 0], result.row_ids[:, 0]):
+                    state.results[sentence] = ('semantic', int(j), float(score)) if score >= threshold else None
+            
+            # Forget sentences the revision dropped, so state tracks the latest draft
+            current = {segment.text for segment in segments1}
+            for sentence in [sentence for sentence in state.results if sentence not in current]:
+                del state.results[sentence]
+                state.embeddings1.pop(sentence, None)
+            
+            matches = []
+            for i, segment in enumerate(segments1):
+                found = state.results[segment.text]
+                if found is not None:
+                    stage, j, score = found
+                    matches.append(self._match(segments1, segments2, i, j, score, stage))
+        
+        progress(1.0, 'matching')
+        return (len(matches) / len(segments1)) * 100, matches
+    
+    def forget(self, document_id):
+        """Drop the recheck state of a document"""
+        with self._document_states_lock:
+            self._document_states.pop(document_id, None)
+    
+    def _document_state(self, document_id, sentences2, threshold):
+        """State for document_id, rebuilt when the reference or the settings changed"""
+        settings = (threshold, self.prefilter, self.lexical_threshold)
+        with self._document_states_lock:
+            state = self._document_states.get(document_id)
+            if state is not None:
+                self._document_states.move_to_end(document_id)
+        if state is not None and state.settings == settings and state.sentences2 == sentences2:
+            return state
+        
+        # Reuse embeddings of reference sentences and draft sentences known from before
+        known = {}
+        if state is not None:
+            known = dict(zip(state.sentences2, state.embeddings2))
+            known.update(state.embeddings1)
+        missing = list(dict.fromkeys(sentence for sentence in sentences2 if sentence not in known))
+        if missing:
+            encode = self.batch_scheduler.encode if self.batch_scheduler else self.encode_batch
+            with metrics.timer('encoding'):
+                known.update(zip(missing, encode(missing)))
+        embeddings2 = np.stack([known[sentence] for sentence in sentences2])
+        reference_index = self.fingerprinter.index_reference(sentences2) if self.prefilter else None
+        
+        new_state = _DocumentState(settings, sentences2, reference_index, embeddings2)
+        if state is not None:
+            new_state.embeddings1 = state.embeddings1
+        with self._document_states_lock:
+            self._document_states[document_id] = new_state
+            self._document_states.move_to_end(document_id)
+            while len(self._document_states) > self.max_document_states:
+                self._document_states.popitem(last=False)
+        return new_state
+    
+    @classmethod
+    def _match(cls, segments1, segments2, i, j, score, stage):
+        """Match dict for sentence i of the first document and sentence j of the second"""
+        # Search stages hand over numpy indices and scores; match dicts must stay JSON-serializable
+        i, j = int(i), int(j)
+        return {
+            'original': segments1[i].text,
+            'matched': segments2[j].text,
+            'similarity': float(score),
+            'sentence_num': i + 1,
+            'stage': stage,
+            **cls._locations(segments1[i], segments2[j])
+        }
+    
+    @staticmethod
+    def _locations(segment1, segment2):
+        """Where a matched sentence pair sits in its source documents"""
+        return {
+            'start': segment1.start,
+            'end': segment1.end,
+            'page': segment1.page,
+            'matched_start': segment2.start,
+            'matched_end': segment2.end,
+            'matched_page': segment2.page
+        }
+
+# Bundled examples (also used by inference_backends.verify_backend_accuracy)
+EXAMPLE_DOCUMENTS = {
+    "English": (
+        """
+    Machine learning is a subset of artificial intelligence. It enables computers 
+    to learn from data without being explicitly programmed.
+    """,
+        """
+    ML is part of AI technology. It allows systems to learn from data automatically.
+    """,
+    ),
+    "Tamil": (
+        """
+    இயந்திர கற்றல் செயற்கை நுண்ணறிவின் ஒரு பகுதி. இது கணினிகள் தரவுகளிலிருந்து கற்றுக்கொள்ள உதவுகிறது.
+    """,
+        """
+    இயந்திர கற்றல் AI தொழில்நுட்பத்தின் பகுதியாகும். இது அமைப்புகளை தானாக தரவுகளிலிருந்து கற்க அனுமதிக்கிறது.
+    """,
+    ),
+}
+
+# Example usage showing multilingual capability
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print("="*60)
+    print("MULTILINGUAL PLAGIARISM DETECTOR")
+    print("="*60)
+    
+    # Initialize detector (downloads multilingual pre-trained model)
+    detector = MultilingualPlagiarismDetector()
+    
+    print("\n" + "="*60)
+    print("MODEL INFO:")
+    print("- Source: Hugging Face Model Hub")
+    print("- Model: paraphrase-multilingual-MiniLM-L12-v2")
+    print("- Languages: 50+ including Tamil, Hindi, English")
+    print("- Pre-trained: YES ✅")
+    print("- Training required: NO ❌")
+    print("="*60 + "\n")
+    
+    for test_num, (language, (doc1, doc2)) in enumerate(EXAMPLE_DOCUMENTS.items(), 1):
+        print(f"Test {test_num}: {language} documents")
+        pct, matches = detector.check_plagiarism(doc1, doc2)
+        print(f"Plagiarism: {pct:.1f}%\n")
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Pre-fork serving: load once in the parent, serve from N forked workers
+
+The parent loads (and warms up) the model, binds the listening socket and
+forks the workers. Model weights are shared copy-on-write by every worker,
+so startup cost and resident memory are paid once instead of per worker.
+POSIX only (uses os.fork).
+"""
+import gc
+import logging
+import os
+import signal
+import socket
+
+logger = logging.getLogger(__name__)
+
+
+def serve_prefork(create_app, host="127.0.0.1", port=7860, workers=2):
+    """
+    Fork `workers` processes that each serve create_app() on one shared socket
+
+    Args:
+        create_app: called in each worker after the fork; returns an ASGI app.
+            Threads (schedulers, job workers) must be started here, since
+            threads of the parent do not survive fork.
+        host, port: address to listen on
+        workers: number of worker processes
+    """
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Keep the collector from touching (and so copying) every inherited object page
+    gc.collect()
+    gc.freeze()
+
+    children = []
+    for index in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                app = create_app()
+                uvicorn.Server(uvicorn.Config(app, log_level="info")).run(sockets=[sock])
+            except BaseException:
+                logger.exception("Worker %d crashed", index)
+                status = 1
+            finally:
+                os._exit(status)
+        children.append(pid)
+    logger.info("Serving on %s:%d with %d pre-forked workers", host, port, workers)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+    sock.close()
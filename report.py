@@ -0,0 +1,179 @@
+"""HTML rendering of plagiarism reports (shared by the app and the benchmarks)"""
+import html
+
+# Match cards rendered per page of the matches panel
+MATCHES_PER_PAGE = 50
+
+# Shared styles of the match cards (add to the page CSS); each card only carries its color
+REPORT_CSS = """
+.pd-match {
+    background: white; border-radius: 12px; padding: 25px; margin: 15px 0;
+    box-shadow: 0 4px 20px rgba(0,0,0,0.1); border-left: 6px solid var(--pd-color);
+    transition: transform 0.2s, box-shadow 0.2s;
+}
+.pd-match-header { display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px; }
+.pd-match-header h3 { margin: 0; color: #1a237e; font-size: 18px; font-weight: 600; }
+.pd-badge {
+    background: var(--pd-color); color: white; padding: 8px 16px; border-radius: 20px;
+    font-weight: 600; font-size: 14px;
+}
+.pd-doc { padding: 15px; border-radius: 8px; margin: 10px 0; }
+.pd-doc1 { background: #fff3e0; border-left: 4px solid #ff9800; }
+.pd-doc2 { background: #e3f2fd; border-left: 4px solid #2196f3; }
+.pd-label { font-weight: 600; font-size: 12px; text-transform: uppercase; margin-bottom: 8px; }
+.pd-doc1 .pd-label { color: #e65100; }
+.pd-doc2 .pd-label { color: #0d47a1; }
+.pd-text { color: #424242; line-height: 1.6; font-size: 15px; }
+.pd-footer { margin-top: 10px; padding-top: 10px; border-top: 1px solid #e0e0e0; color: #757575; font-size: 12px; }
+.pd-pager { text-align: center; color: #757575; font-size: 14px; margin: 10px 0; }
+"""
+
+_MATCH_CARD = (
+    '<div class="pd-match" style="--pd-color:{color}">'
+    '<div class="pd-match-header"><h3>Match #{number}</h3><span class="pd-badge">{similarity:.1f}% Similar</span></div>'
+    '<div class="pd-doc pd-doc1"><div class="pd-label">📄 Document 1 (Original)</div><div class="pd-text">{original}</div></div>'
+    '<div class="pd-doc pd-doc2"><div class="pd-label">📄 Document 2 (Matched)</div><div class="pd-text">{matched}</div></div>'
+    '<div class="pd-footer">Sentence Position: #{sentence_num} (page {page}) • Found by: {stage} stage</div>'
+    '</div>'
+)
+
+def get_severity_color(percentage):
+    """Return color based on plagiarism severity"""
+    if percentage >= 75:
+        return "#d32f2f", "Critical", "🚨"
+    elif percentage >= 50:
+        return "#f57c00", "High", "⚠️"
+    elif percentage >= 25:
+        return "#fbc02d", "Moderate", "⚡"
+    else:
+        return "#388e3c", "Low", "✅"
+
+def create_progress_bar(percentage):
+    """Create a visual progress bar"""
+    color, severity, icon = get_severity_color(percentage)
+    
+    return f"""
+    <div style="margin: 20px 0;">
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
+            <span style="font-size: 18px; font-weight: 600; color: #1a237e;">Plagiarism Score</span>
+            <span style="font-size: 24px; font-weight: 700; color: {color};">{icon} {percentage:.1f}%</span>
+        </div>
+        <div style="background: #e0e0e0; border-radius: 10px; height: 30px; overflow: hidden; box-shadow: inset 0 2px 4px rgba(0,0,0,0.1);">
+            <div style="background: linear-gradient(90deg, {color}, {color}aa); width: {percentage}%; height: 100%; 
+                        border-radius: 10px; transition: width 0.5s ease; display: flex; align-items: center; justify-content: flex-end; padding-right: 10px;">
+                <span style="color: white; font-weight: 600; font-size: 12px;">{severity}</span>
+            </div>
+        </div>
+    </div>
+    """
+
+def render_report(pct, matches, total_sentences, threshold):
+    """Summary card: score bar, counts, threshold, severity and model info"""
+    color, severity, icon = get_severity_color(pct)
+    
+    # Create beautiful report
+    report = f"""
+    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 15px; color: white; margin-bottom: 20px; box-shadow: 0 10px 30px rgba(0,0,0,0.3);">
+        <h1 style="margin: 0; font-size: 32px; font-weight: 700;">🔍 Plagiarism Analysis Report</h1>
+        <p style="margin: 10px 0 0 0; opacity: 0.9; font-size: 16px;">Powered by Hugging Face Multilingual AI 🤗🌍</p>
+    </div>
+    
+    {create_progress_bar(pct)}
+    
+    <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin: 30px 0;">
+        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 25px; border-radius: 12px; text-align: center; color: white; box-shadow: 0 4px 15px rgba(102,126,234,0.4);">
+            <div style="font-size: 36px; font-weight: 700; margin-bottom: 5px;">{total_sentences}</div>
+            <div style="font-size: 14px; opacity: 0.9;">Total Sentences</div>
+        </div>
+        
+        <div style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); padding: 25px; border-radius: 12px; text-align: center; color: white; box-shadow: 0 4px 15px rgba(245,87,108,0.4);">
+            <div style="font-size: 36px; font-weight: 700; margin-bottom: 5px;">{len(matches)}</div>
+            <div style="font-size: 14px; opacity: 0.9;">Matches Found</div>
+        </div>
+        
+        <div style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%); padding: 25px; border-radius: 12px; text-align: center; color: white; box-shadow: 0 4px 15px rgba(79,172,254,0.4);">
+            <div style="font-size: 36px; font-weight: 700; margin-bottom: 5px;">{int(threshold*100)}%</div>
+            <div style="font-size: 14px; opacity: 0.9;">Threshold Used</div>
+        </div>
+        
+        <div style="background: linear-gradient(135deg, {color}dd 0%, {color} 100%); padding: 25px; border-radius: 12px; text-align: center; color: white; box-shadow: 0 4px 15px rgba(0,0,0,0.3);">
+            <div style="font-size: 36px; font-weight: 700; margin-bottom: 5px;">{severity}</div>
+            <div style="font-size: 14px; opacity: 0.9;">Severity Level</div>
+        </div>
+    </div>
+    
+    <div style="background: #f5f5f5; padding: 20px; border-radius: 10px; border-left: 5px solid #667eea; margin: 20px 0;">
+        <h3 style="margin: 0 0 10px 0; color: #1a237e; font-size: 16px;">🤗 Model Information</h3>
+        <p style="margin: 5px 0; color: #424242; font-size: 14px;"><strong>Model:</strong> paraphrase-multilingual-MiniLM-L12-v2</p>
+        <p style="margin: 5px 0; color: #424242; font-size: 14px;"><strong>Languages:</strong> Tamil, Hindi, English, Telugu, Bengali + 45 more</p>
+        <p style="margin: 5px 0; color: #424242; font-size: 14px;"><strong>Type:</strong> Sentence Transformer (Pre-trained BERT)</p>
+    </div>
+    """
+    return report
+
+def page_count(num_matches, page_size=MATCHES_PER_PAGE):
+    return max(1, -(-num_matches // page_size))
+
+def render_match_card(number, match):
+    """One match card (styled by REPORT_CSS)"""
+    similarity_pct = match['similarity'] * 100
+    bar_color, _, _ = get_severity_color(similarity_pct)
+    return _MATCH_CARD.format(
+        color=bar_color,
+        number=number,
+        similarity=similarity_pct,
+        original=html.escape(match['original']),
+        matched=html.escape(match['matched']),
+        sentence_num=match['sentence_num'],
+        page=match.get('page', 1),
+        stage=match.get('stage', 'semantic') + (f" ({match['tier']} model)" if 'tier' in match else "")
+    )
+
+def render_progress_report(matches_found):
+    """Summary card shown while the analysis is still running"""
+    return f"""
+    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 15px; color: white; margin-bottom: 20px; box-shadow: 0 10px 30px rgba(0,0,0,0.3);">
+        <h1 style="margin: 0; font-size: 32px; font-weight: 700;">🔍 Plagiarism Analysis Report</h1>
+        <p style="margin: 10px 0 0 0; opacity: 0.9; font-size: 16px;">⏳ Analysis in progress... {matches_found} matches found so far</p>
+    </div>
+    """
+
+def render_matches(matches, page=1, page_size=MATCHES_PER_PAGE, complete=True):
+    """
+    One page of match cards (or the all-clear card when there are none)
+    
+    Only page_size cards are rendered, so the panel stays small however many
+    matches a document has. complete=False marks a partial list from a
+    running analysis.
+    """
+    parts = ["""
+    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 20px; border-radius: 15px; color: white; margin-bottom: 20px;">
+        <h2 style="margin: 0; font-size: 24px; font-weight: 600;">🔍 Detailed Match Analysis</h2>
+    </div>
+    """]
+    
+    if matches:
+        pages = page_count(len(matches), page_size)
+        page = max(1, min(page, pages))
+        first = (page - 1) * page_size
+        shown = matches[first:first + page_size]
+        status = f"Page {page} of {pages}" if complete else "analysis still running"
+        pager = (f'<div class="pd-pager">Showing matches {first + 1}–{first + len(shown)} '
+                 f'of {len(matches)} • {status}</div>')
+        parts.append(pager)
+        parts.extend(render_match_card(number, match) for number, match in enumerate(shown, first + 1))
+        if len(matches) > page_size:
+            parts.append(pager)
+    elif complete:
+        parts.append("""
+        <div style="background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%); 
+                    padding: 40px; border-radius: 15px; text-align: center; color: white;
+                    box-shadow: 0 10px 30px rgba(56,239,125,0.3);">
+            <div style="font-size: 64px; margin-bottom: 20px;">✅</div>
+            <h3 style="margin: 0; font-size: 28px; font-weight: 700;">No Plagiarism Detected!</h3>
+            <p style="margin: 15px 0 0 0; font-size: 16px; opacity: 0.9;">
+                The documents appear to be original and unique.
+            </p>
+        </div>
+        """)
+    return "".join(parts)
@@ -0,0 +1,76 @@
+import re
+from bisect import bisect_right
+from collections import namedtuple
+
+# Latin/Devanagari (. ! ? । ॥ |), CJK full-width (。！？), Arabic/Urdu (؟ ۔),
+# Ethiopic (።) and Myanmar (။) sentence terminators
+SENTENCE_TERMINATORS = '.!?।॥|。！？؟۔።။'
+
+_FRAGMENT = re.compile('[^' + re.escape(SENTENCE_TERMINATORS) + ']+')
+
+# text: stripped sentence; start/end: character offsets in the document
+# (pages joined with "\n"); page: 1-based page the sentence starts on
+Sentence = namedtuple('Sentence', ['text', 'start', 'end', 'page'])
+
+
+def iter_sentences(document, min_length=10):
+    """
+    Lazily split a document into sentences with source offsets
+
+    Makes a single pass over the text with a precompiled pattern, so huge
+    documents can be consumed (e.g. encoded) while they are still being
+    split. Only the unfinished sentence at the end of a page is carried
+    over to the next one.
+
+    Args:
+        document: text, or an iterable of page texts (e.g. from a PDF)
+        min_length: sentences of this many characters or fewer are skipped
+
+    Yields:
+        Sentence tuples in document order
+    """
+    pages = [document] if isinstance(document, str) else document
+
+    page_starts = []
+    carry = ''
+    carry_start = 0
+    next_page_start = 0
+
+    for page in pages:
+        page_starts.append(next_page_start)
+        if carry:
+            buffer = carry + '\n' + page
+            buffer_start = carry_start
+        else:
+            buffer = page
+            buffer_start = next_page_start
+        next_page_start += len(page) + 1
+
+        carry = ''
+        for match in _FRAGMENT.finditer(buffer):
+            if match.end() == len(buffer):
+                # No terminator yet: the sentence may continue on the next page
+                carry = match.group()
+                carry_start = buffer_start + match.start()
+                break
+            sentence = _make_sentence(match.group(), buffer_start + match.start(), page_starts, min_length)
+            if sentence is not None:
+                yield sentence
+
+    if carry:
+        sentence = _make_sentence(carry, carry_start, page_starts, min_length)
+        if sentence is not None:
+            yield sentence
+
+
+def split_sentences(document, min_length=10):
+    """List of sentence strings (no offsets)"""
+    return [sentence.text for sentence in iter_sentences(document, min_length)]
+
+
+def _make_sentence(fragment, fragment_start, page_starts, min_length):
+    text = fragment.strip()
+    if len(text) <= min_length:
+        return None
+    start = fragment_start + len(fragment) - len(fragment.lstrip())
+    return Sentence(text, start, start + len(text), bisect_right(page_starts, start))
@@ -0,0 +1,91 @@
+from collections import namedtuple
+
+import numpy as np
+
+from embedding_store import merge_top_k, normalize_rows
+
+# row_scores/row_ids: (n1, k) best matches in embeddings2 for each row of embeddings1, best first
+# col_scores/col_ids: (n2,) best match in embeddings1 for each row of embeddings2 (bidirectional only)
+MatchResult = namedtuple('MatchResult', ['row_scores', 'row_ids', 'col_scores', 'col_ids'])
+
+
+def tile_shape(n1, n2, memory_limit_mb):
+    """Largest roughly square float32 tile that fits in memory_limit_mb"""
+    # Half the budget for the tile itself, half for argmax/argpartition temporaries
+    cells = max(1, int(memory_limit_mb * 1024 * 1024) // 4 // 2)
+    side = max(1, int(np.sqrt(cells)))
+    rows = max(1, min(n1, side))
+    cols = max(1, min(n2, cells // rows))
+    return rows, cols
+
+
+def best_matches(embeddings1, embeddings2, k=1, bidirectional=False, memory_limit_mb=256, normalized=False):
+    """
+    Cosine top-k matches between two sets of embeddings, tile by tile
+
+    Both sides are L2-normalized once (skipped when the caller already
+    did, e.g. for a reference matched chunk by chunk); each tile of the similarity matrix is
+    one BLAS matmul and is folded into running per-row (and optionally
+    per-column) best scores before the next tile is computed. The full
+    len(embeddings1) x len(embeddings2) matrix is never held in memory, so
+    peak memory is bounded by memory_limit_mb regardless of document size.
+
+    Args:
+        embeddings1, embeddings2: (n1, dim) and (n2, dim) arrays
+        k: matches kept per row of embeddings1
+        bidirectional: also track the best row of embeddings1 for each row of embeddings2
+        memory_limit_mb: memory budget for similarity tiles
+        normalized: both arrays are already L2-normalized
+
+    Returns:
+        MatchResult (col_scores/col_ids are None unless bidirectional)
+    """
+    if normalized:
+        a, b = embeddings1, embeddings2
+    else:
+        a = normalize_rows(embeddings1)
+        b = normalize_rows(embeddings2)
+    n1, n2 = len(a), len(b)
+    k = max(1, min(k, n2))
+
+    row_scores = np.full((n1, k), -np.inf, dtype=np.float32)
+    row_ids = np.full((n1, k), -1, dtype=np.int64)
+    col_scores = col_ids = None
+    if bidirectional:
+        col_scores = np.full(n2, -np.inf, dtype=np.float32)
+        col_ids = np.full(n2, -1, dtype=np.int64)
+
+    if n1 == 0 or n2 == 0:
+        return MatchResult(row_scores, row_ids, col_scores, col_ids)
+
+    tile_rows, tile_cols = tile_shape(n1, n2, memory_limit_mb)
+    for r0 in range(0, n1, tile_rows):
+        r1 = min(r0 + tile_rows, n1)
+        for c0 in range(0, n2, tile_cols):
+            c1 = min(c0 + tile_cols, n2)
+            tile = a[r0:r1] @ b[c0:c1].T
+
+            if k == 1:
+                tile_best = tile.argmax(axis=1)
+                tile_score = tile[np.arange(r1 - r0), tile_best]
+                better = tile_score > row_scores[r0:r1, 0]
+                row_scores[r0:r1, 0] = np.where(better, tile_score, row_scores[r0:r1, 0])
+                row_ids[r0:r1, 0] = np.where(better, tile_best + c0, row_ids[r0:r1, 0])
+            else:
+                ids = np.broadcast_to(np.arange(c0, c1), tile.shape)
+                row_scores[r0:r1], row_ids[r0:r1] = merge_top_k(
+                    row_scores[r0:r1], row_ids[r0:r1], tile, ids, k)
+
+            if bidirectional:
+                tile_best = tile.argmax(axis=0)
+                tile_score = tile[tile_best, np.arange(c1 - c0)]
+                better = tile_score > col_scores[c0:c1]
+                col_scores[c0:c1] = np.where(better, tile_score, col_scores[c0:c1])
+                col_ids[c0:c1] = np.where(better, tile_best + r0, col_ids[c0:c1])
+
+    if k > 1:
+        order = np.argsort(-row_scores, axis=1, kind='stable')
+        row_scores = np.take_along_axis(row_scores, order, axis=1)
+        row_ids = np.take_along_axis(row_ids, order, axis=1)
+
+    return MatchResult(row_scores, row_ids, col_scores, col_ids)
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TINY_VOCABULARY = (
+    "[PAD] [UNK] [CLS] [SEP] [MASK] machine learning is a subset of artificial intelligence it enables "
+    "computers to learn from data without being explicitly programmed the model compares every sentence "
+    "students submit research papers for review allows systems automatically"
+).split()
+
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tmp_path_factory):
+    """A tiny randomly initialized BERT saved locally, so tests never touch the Hub"""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    directory = tmp_path_factory.mktemp("tiny_model")
+    vocab_path = directory / "vocab.txt"
+    vocab_path.write_text("\n".join(TINY_VOCABULARY) + "\n", encoding="utf-8")
+    BertTokenizerFast(vocab_file=str(vocab_path)).save_pretrained(str(directory))
+    config = BertConfig(vocab_size=len(TINY_VOCABULARY), hidden_size=32, num_hidden_layers=2,
+                        num_attention_heads=2, intermediate_size=64)
+    BertModel(config).save_pretrained(str(directory))
+    return str(directory)
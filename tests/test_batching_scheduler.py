@@ -0,0 +1,60 @@
+import threading
+
+import numpy as np
+import pytest
+
+from batching_scheduler import MicroBatchScheduler
+from metrics import metrics, start_trace
+
+
+def test_failed_request_is_not_encoded_further():
+    calls = []
+    lock = threading.Lock()
+
+    def encode(sentences):
+        with lock:
+            calls.append(list(sentences))
+        if any(sentence.startswith("bad") for sentence in sentences):
+            raise ValueError("encoder failed")
+        return np.zeros((len(sentences), 4), dtype=np.float32)
+
+    scheduler = MicroBatchScheduler(encode, max_batch_size=4, max_wait_ms=1)
+    try:
+        with pytest.raises(ValueError):
+            scheduler.encode([f"bad {i}" for i in range(48)])
+        # Only the batch that failed was encoded; the other 11 batches are dropped
+        assert len(calls) == 1
+
+        # The scheduler keeps serving other callers
+        assert scheduler.encode(["good sentence"] * 10).shape == (10, 4)
+    finally:
+        scheduler.close()
+    assert len(calls) == 1 + 3
+
+
+def test_batch_stages_reach_every_caller_trace():
+    def encode(sentences):
+        with metrics.timer('forward'):
+            metrics.inc('forward_batches')
+        return np.zeros((len(sentences), 4), dtype=np.float32)
+
+    traces = {}
+
+    def caller(name):
+        with start_trace() as trace:
+            scheduler.encode([f"{name} sentence {i}" for i in range(3)])
+        traces[name] = trace
+
+    scheduler = MicroBatchScheduler(encode, max_batch_size=64, max_wait_ms=50)
+    try:
+        threads = [threading.Thread(target=caller, args=(name,)) for name in ("first", "second")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        scheduler.close()
+
+    for trace in traces.values():
+        assert [span['stage'] for span in trace.spans] == ['forward'] * scheduler.batches
+        assert trace.counters['forward_batches'] == scheduler.batches
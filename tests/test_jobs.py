@@ -0,0 +1,31 @@
+import time
+
+from jobs import DONE, FAILED, FINISHED_STATES, JobEngine, JobStore
+
+
+def wait_finished(engine, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    job = engine.get(job_id)
+    while job['status'] not in FINISHED_STATES:
+        assert time.monotonic() < deadline, f"job stuck in {job['status']}"
+        job = engine.wait(job_id, job['progress'], timeout=0.5)
+    return job
+
+
+def test_unserializable_result_fails_job_and_worker_survives(tmp_path):
+    def run(params, progress):
+        progress(0.5, 'encoding')
+        if params['broken']:
+            return {'matches': [object()]}
+        return {'matches': []}
+
+    engine = JobEngine(run, JobStore(str(tmp_path / "jobs.sqlite3")), workers=1)
+
+    broken = wait_finished(engine, engine.submit({'broken': True}))
+    assert broken['status'] == FAILED
+    assert "TypeError" in broken['error']
+
+    # The single worker is still alive and picks up the next job
+    healthy = wait_finished(engine, engine.submit({'broken': False}))
+    assert healthy['status'] == DONE
+    assert healthy['result'] == {'matches': []}
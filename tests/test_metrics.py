@@ -0,0 +1,32 @@
+import json
+
+from metrics import Metrics, render_directory
+
+
+def test_directory_sums_the_registries_of_every_process(tmp_path):
+    worker1, worker2 = Metrics(enabled=True), Metrics(enabled=True)
+    worker1.inc('checks', 2)
+    worker2.inc('checks', 3)
+    worker1.observe('stage_seconds', 0.02, stage='forward')
+    worker2.observe('stage_seconds', 0.5, stage='forward')
+    # Each worker publishes under its own process id
+    for pid, worker in ((101, worker1), (102, worker2)):
+        (tmp_path / f"{pid}.json").write_text(json.dumps(worker.export_state()))
+
+    text = render_directory(str(tmp_path))
+
+    assert "plagiarism_checks_total 5" in text
+    assert 'plagiarism_stage_seconds_count{stage="forward"} 2' in text
+    assert 'plagiarism_stage_seconds_bucket{stage="forward",le="0.025"} 1' in text
+    assert 'plagiarism_stage_seconds_bucket{stage="forward",le="0.5"} 2' in text
+
+
+def test_publish_overwrites_this_process_state(tmp_path):
+    registry = Metrics(enabled=True)
+    registry.inc('checks')
+    registry.publish(str(tmp_path))
+    registry.inc('checks')
+    registry.publish(str(tmp_path))
+
+    assert "plagiarism_checks_total 2" in render_directory(str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,93 @@
+import json
+import threading
+
+import pytest
+
+from plagiarism_checker_multilingual import EXAMPLE_DOCUMENTS, MultilingualPlagiarismDetector
+
+
+@pytest.fixture(scope="module")
+def detector(tiny_model_dir):
+    return MultilingualPlagiarismDetector(tiny_model_dir, prefilter=False, local_files_only=True,
+                                          draft_layers=1, window_size=2, window_threshold=-1.0)
+
+
+@pytest.mark.parametrize("mode", [
+    {'cascade': False},
+    {'cascade': False, 'hierarchical': True},
+    {'cascade': True},
+])
+def test_matches_are_json_serializable(detector, mode):
+    text1, text2 = EXAMPLE_DOCUMENTS["English"]
+    # Threshold -1 flags every sentence, so every search path produces matches
+    pct, matches = detector.check_plagiarism(text1, text2, threshold=-1.0, **mode)
+
+    assert matches
+    assert json.loads(json.dumps({'plagiarism_percentage': pct, 'matches': matches}))['matches'] == matches
+
+
+def test_concurrent_checks_keep_their_own_timings(detector):
+    text1, text2 = EXAMPLE_DOCUMENTS["English"]
+    results = [None] * 8
+
+    def check(n):
+        details = {}
+        results[n] = (detector.check_plagiarism(text1, text2, cascade=n % 2 == 0, details=details), details)
+
+    threads = [threading.Thread(target=check, args=(n,)) for n in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for (pct, matches), details in results:
+        assert 'embedding' in details['timings'] and 'similarity' in details['timings']
+        assert details['stats']['sentence_comparisons'] > 0
+
+
+def test_repeated_sentences_are_encoded_once(detector, monkeypatch):
+    encoded = []
+    encode_uncached = detector._encode_uncached
+
+    def counting_encode(sentences, batch_size):
+        encoded.extend(sentences)
+        return encode_uncached(sentences, batch_size)
+
+    monkeypatch.setattr(detector, '_encode_uncached', counting_encode)
+    words = "machine learning data model systems papers computers students review intelligence".split()
+    text1 = " ".join(f"{word} is a subset of learning." for word in words) * 60
+    text2 = " ".join(f"students submit {word} for review." for word in words) * 60
+    detector.check_plagiarism(text1, text2, cascade=False)
+
+    assert len(encoded) == len(set(encoded)) == 20
+
+
+def test_cascade_streams_draft_matches_before_the_full_tier(detector):
+    text1, text2 = EXAMPLE_DOCUMENTS["English"]
+    batches = []
+    # Draft threshold -1 accepts every same-language sentence in the draft tier
+    detector.draft_threshold = -1.0
+    try:
+        _, matches = detector.check_plagiarism(text1 * 300, text2, threshold=2.0, cascade=True,
+                                               on_matches=lambda found: batches.append(found))
+    finally:
+        detector.draft_threshold = None
+
+    assert len(batches) > 1
+    assert all(match['tier'] == 'draft' for batch in batches for match in batch)
+    assert sum(len(batch) for batch in batches) == len(matches) == len(detector.split_into_sentences(text1 * 300))
+
+
+def test_calibrated_draft_threshold_follows_the_full_threshold(detector):
+    text1, text2 = EXAMPLE_DOCUMENTS["English"]
+    try:
+        # Everything the full model flags at -1 and nothing it flags at 2
+        lowest = detector.calibrate_draft(text1, text2, threshold=-1.0)
+        highest = detector.calibrate_draft(text1, text2, threshold=2.0)
+        assert detector.draft_threshold == highest
+        _, matches = detector.check_plagiarism(text1, text2, threshold=2.0, cascade=True)
+    finally:
+        detector.draft_threshold = None
+
+    assert lowest < highest
+    assert not matches
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import metrics
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt')
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "plagiarism_detector", "pages")
+# Documents kept in a disk cache directory; least recently used ones are deleted beyond this
+MAX_DISK_CACHE_FILES = 1000
+
+# PDFs with fewer pages than this are not worth shipping to worker processes
+PARALLEL_MIN_PAGES = 16
+
+_memory_cache = OrderedDict()
+_memory_cache_size = 64
+_lock = threading.Lock()
+_pool = None
+
+
+def file_hash(path):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_pages(path, workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Extract per-page text from a .pdf or .txt file
+
+    Large PDFs are split into page ranges that are extracted in parallel
+    by a shared process pool. Results are cached by content hash (in memory
+    and, unless cache_dir is None, as JSON on disk, keeping the
+    MAX_DISK_CACHE_FILES most recently used documents), so re-uploads and
+    reference documents are never parsed twice.
+
+    Args:
+        path: file path
+        workers: extraction processes (None = CPU count, 1 = no pool)
+        cache_dir: directory for the persistent cache (None = memory only)
+
+    Returns:
+        list of page texts (a .txt file is a single page)
+    """
+    with metrics.timer('extraction'):
+        key = file_hash(path)
+
+        with _lock:
+            pages = _memory_cache.get(key)
+            if pages is not None:
+                _memory_cache.move_to_end(key)
+        if pages is not None:
+            metrics.inc('extraction_cache_lookups', result='memory')
+            return pages
+
+        pages = _read_disk_cache(cache_dir, key)
+        if pages is not None:
+            metrics.inc('extraction_cache_lookups', result='disk')
+        else:
+            metrics.inc('extraction_cache_lookups', result='miss')
+            if path.lower().endswith('.pdf'):
+                pages = _extract_pdf_pages(path, workers)
+            else:
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    pages = [f.read()]
+            metrics.inc('extracted_pages', len(pages))
+            _write_disk_cache(cache_dir, key, pages)
+
+    with _lock:
+        _memory_cache[key] = pages
+        while len(_memory_cache) > _memory_cache_size:
+            _memory_cache.popitem(last=False)
+    return pages
+
+
+def try_extract_pages(path):
+    """
+    extract_pages for worker pools that must not stop on one bad file
+
+    Extracts without a nested page pool (the documents are already spread
+    over the caller's pool).
+
+    Returns:
+        (path, pages, None) on success, (path, None, error message) on failure
+    """
+    try:
+        return path, extract_pages(path, workers=1), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def clear_memory_cache():
+    """Forget in-memory extraction results (the disk cache is left alone)"""
+    with _lock:
+        _memory_cache.clear()
+
+
+def extract_text(path, workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Extract the full text of a .pdf or .txt file (pages separated by newlines)"""
+    return "".join(page + "\n" for page in extract_pages(path, workers, cache_dir))
+
+
+def _extract_page_range(path, start, end):
+    import PyPDF2
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[i].extract_text() for i in range(start, end)]
+
+
+def _extract_pdf_pages(path, workers):
+    # Imported on first use, so importing this module stays cheap
+    import PyPDF2
+    num_pages = len(PyPDF2.PdfReader(path).pages)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or num_pages < PARALLEL_MIN_PAGES:
+        return _extract_page_range(path, 0, num_pages)
+
+    # One contiguous page range per task, a few tasks per worker for balance
+    num_tasks = min(num_pages, workers * 4)
+    bounds = [num_pages * i // num_tasks for i in range(num_tasks + 1)]
+    pool = _get_pool(workers)
+    futures = [pool.submit(_extract_page_range, path, bounds[i], bounds[i + 1])
+               for i in range(num_tasks)]
+
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def _get_pool(workers):
+    global _pool
+    with _lock:
+        if _pool is None:
+            # The pool may be created inside a multithreaded, torch-loaded server:
+            # never fork that process, start workers from a clean forkserver instead
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def _read_disk_cache(cache_dir, key):
+    if cache_dir is None:
+        return None
+    path = os.path.join(cache_dir, key + '.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            pages = json.load(f)
+        # The modification time orders files for eviction, so a hit counts as a use
+        os.utime(path)
+        return pages
+    except (OSError, ValueError):
+        return None
+
+
+def _write_disk_cache(cache_dir, key, pages):
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + '.json')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(pages, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    _evict_disk_cache(cache_dir)
+
+
+def _evict_disk_cache(cache_dir):
+    """Delete the least recently used files beyond MAX_DISK_CACHE_FILES"""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.json'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+    if len(entries) <= MAX_DISK_CACHE_FILES:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - MAX_DISK_CACHE_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass